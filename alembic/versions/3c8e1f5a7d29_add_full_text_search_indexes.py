@@ -0,0 +1,44 @@
+"""add_full_text_search_indexes
+
+Revision ID: 3c8e1f5a7d29
+Revises: f2b6d8e1a514
+Create Date: 2026-10-18 19:02:44.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c8e1f5a7d29'
+down_revision: Union[str, None] = 'f2b6d8e1a514'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Expression indexes, kept current by Postgres on every write. The expressions must match
+    # POST_DOCUMENT / QUESTION_DOCUMENT in src/repository/search.py for the planner to use them.
+    op.execute(
+        """
+        CREATE INDEX ix_post_caption_fts ON post
+        USING gin (to_tsvector('english'::regconfig, coalesce(caption, '')))
+        """
+    )
+    op.execute(
+        """
+        CREATE INDEX ix_question_text_fts ON question
+        USING gin ((
+            setweight(to_tsvector('english'::regconfig, question), 'A')
+            || setweight(to_tsvector('english'::regconfig, coalesce(explanation, '')), 'B')
+        ))
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_question_text_fts', table_name='question')
+    op.drop_index('ix_post_caption_fts', table_name='post')
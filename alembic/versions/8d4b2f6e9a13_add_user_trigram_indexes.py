@@ -0,0 +1,32 @@
+"""add_user_trigram_indexes
+
+Revision ID: 8d4b2f6e9a13
+Revises: 3c8e1f5a7d29
+Create Date: 2026-10-18 20:11:27.350918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4b2f6e9a13'
+down_revision: Union[str, None] = '3c8e1f5a7d29'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Autocomplete falls back to ILIKE 'prefix%' / '% prefix%' queries while the in-memory
+    # trie is loading or disabled, trigram GIN indexes keep those off a sequential scan
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute('CREATE INDEX ix_user_username_trgm ON "user" USING gin (username gin_trgm_ops)')
+    op.execute('CREATE INDEX ix_user_fullname_trgm ON "user" USING gin (fullname gin_trgm_ops)')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_fullname_trgm', table_name='user')
+    op.drop_index('ix_user_username_trgm', table_name='user')
@@ -0,0 +1,50 @@
+"""add_timeline_entry
+
+Revision ID: a3c91e7f52d4
+Revises: 694d9080706e
+Create Date: 2026-10-18 10:12:41.238811
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c91e7f52d4'
+down_revision: Union[str, None] = '694d9080706e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('timelineentry',
+    sa.Column('owner_user_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.String(), nullable=False),
+    sa.Column('author_user_id', sa.Integer(), nullable=False),
+    sa.Column('datetime_posted', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_user_id'], ['user.user_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['post_id'], ['post.post_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['author_user_id'], ['user.user_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('owner_user_id', 'post_id')
+    )
+    op.create_index('ix_timelineentry_owner_posted', 'timelineentry', ['owner_user_id', 'datetime_posted', 'post_id'], unique=False)
+
+    # Materialize the timelines for the posts that already exist
+    op.execute(
+        """
+        INSERT INTO timelineentry (owner_user_id, post_id, author_user_id, datetime_posted)
+        SELECT followrequest.requester_user_id, post.post_id, post.author_user_id, post.datetime_posted
+        FROM post
+        JOIN followrequest ON followrequest.requested_user_id = post.author_user_id
+        WHERE followrequest.status = 'accepted'
+        ON CONFLICT DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_timelineentry_owner_posted', table_name='timelineentry')
+    op.drop_table('timelineentry')
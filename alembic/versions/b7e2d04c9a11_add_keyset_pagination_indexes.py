@@ -0,0 +1,34 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: b7e2d04c9a11
+Revises: a3c91e7f52d4
+Create Date: 2026-10-18 11:02:17.503264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d04c9a11'
+down_revision: Union[str, None] = 'a3c91e7f52d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Composite indexes matching the (sort key, tie breaker) of every cursor route
+    op.create_index('ix_post_author_posted', 'post', ['author_user_id', 'datetime_posted', 'post_id'], unique=False)
+    op.create_index('ix_postlike_post_liked', 'postlike', ['post_id', 'datetime_liked', 'liker_user_id'], unique=False)
+    op.create_index('ix_postcomment_post_comment', 'postcomment', ['post_id', 'comment_id'], unique=False)
+    op.create_index('ix_exam_uploaded', 'exam', ['datetime_uploaded', 'exam_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_exam_uploaded', table_name='exam')
+    op.drop_index('ix_postcomment_post_comment', table_name='postcomment')
+    op.drop_index('ix_postlike_post_liked', table_name='postlike')
+    op.drop_index('ix_post_author_posted', table_name='post')
@@ -0,0 +1,54 @@
+"""store_media_object_keys
+
+Revision ID: c5d8a1f3e620
+Revises: b7e2d04c9a11
+Create Date: 2026-10-18 12:20:54.118203
+
+"""
+from typing import Sequence, Union
+from os import getenv
+from urllib.parse import urlparse, unquote
+
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d8a1f3e620'
+down_revision: Union[str, None] = 'b7e2d04c9a11'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _object_key(url: str, bucket: str) -> str:
+    # same rules as lib.presign.object_key_from_url, copied so the migration stays frozen
+    parsed = urlparse(url)
+    path = unquote(parsed.path).lstrip("/")
+    if parsed.netloc.startswith(f"{bucket}."):
+        return path
+    if path.startswith(f"{bucket}/"):
+        return path[len(bucket) + 1:]
+    return url
+
+
+def upgrade() -> None:
+    # mediaurl.url held presigned URLs, keep only the object key and sign at response time
+    bucket = getenv("S3_BUCKET")
+    if not bucket:
+        raise RuntimeError("S3_BUCKET must be set to rewrite mediaurl rows into object keys")
+
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT post_id, url FROM mediaurl WHERE url LIKE 'http%'")).all()
+    for post_id, url in rows:
+        key = _object_key(url, bucket)
+        if key != url:
+            conn.execute(
+                sa.text("UPDATE mediaurl SET url = :key WHERE post_id = :post_id AND url = :url"),
+                {"key": key, "post_id": post_id, "url": url},
+            )
+
+
+def downgrade() -> None:
+    # signed URLs expire, there is nothing meaningful to restore
+    pass
@@ -0,0 +1,54 @@
+"""add_denormalized_counters
+
+Revision ID: d91f4b6c2e87
+Revises: c5d8a1f3e620
+Create Date: 2026-10-18 13:05:31.640977
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91f4b6c2e87'
+down_revision: Union[str, None] = 'c5d8a1f3e620'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('post', sa.Column('like_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('post', sa.Column('comment_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('user', sa.Column('posts_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('user', sa.Column('followers_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('user', sa.Column('following_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Start from the real counts, same statements as reconcile_counters
+    op.execute(
+        """
+        UPDATE post SET
+            like_count = (SELECT count(*) FROM postlike WHERE postlike.post_id = post.post_id),
+            comment_count = (SELECT count(*) FROM postcomment WHERE postcomment.post_id = post.post_id)
+        """
+    )
+    op.execute(
+        """
+        UPDATE "user" SET
+            posts_count = (SELECT count(*) FROM post WHERE post.author_user_id = "user".user_id),
+            followers_count = (SELECT count(*) FROM followrequest
+                               WHERE followrequest.requested_user_id = "user".user_id AND followrequest.status = 'accepted'),
+            following_count = (SELECT count(*) FROM followrequest
+                               WHERE followrequest.requester_user_id = "user".user_id AND followrequest.status = 'accepted')
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('user', 'following_count')
+    op.drop_column('user', 'followers_count')
+    op.drop_column('user', 'posts_count')
+    op.drop_column('post', 'comment_count')
+    op.drop_column('post', 'like_count')
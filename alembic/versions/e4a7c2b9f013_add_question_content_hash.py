@@ -0,0 +1,41 @@
+"""add_question_content_hash
+
+Revision ID: e4a7c2b9f013
+Revises: d91f4b6c2e87
+Create Date: 2026-10-18 15:12:08.204417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+import sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c2b9f013'
+down_revision: Union[str, None] = 'd91f4b6c2e87'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('question', sa.Column('content_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True))
+
+    # Hash the first row of every (topic, text) pair, duplicates already in the bank stay NULL
+    op.execute(
+        """
+        UPDATE question SET content_hash = encode(sha256(convert_to(question.question, 'UTF8')), 'hex')
+        FROM (
+            SELECT DISTINCT ON (topic_id, question) id FROM question ORDER BY topic_id, question, id
+        ) AS first_copy
+        WHERE question.id = first_copy.id
+        """
+    )
+    op.create_index('ux_question_topic_content_hash', 'question', ['topic_id', 'content_hash'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ux_question_topic_content_hash', table_name='question')
+    op.drop_column('question', 'content_hash')
@@ -0,0 +1,79 @@
+"""normalize_question_content_hash
+
+Revision ID: f2b6d8e1a514
+Revises: e4a7c2b9f013
+Create Date: 2026-10-18 15:48:37.915260
+
+"""
+from typing import Sequence, Union
+import hashlib
+import json
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6d8e1a514'
+down_revision: Union[str, None] = 'e4a7c2b9f013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _normalize(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def _content_hash(question: str, options) -> str:
+    # same rules as question_ingest.question_content_hash, copied so the migration stays frozen
+    parts = [_normalize(question)]
+    for option in sorted(options or [], key=lambda option: str(option.get("label"))):
+        parts.append(f"{option.get('label')}:{_normalize(str(option.get('value', '')))}")
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+def upgrade() -> None:
+    # Rehash every question with the normalized form. Rows that now collide with an earlier
+    # question of the same topic keep a NULL hash, like duplicates appended through POST.
+    op.drop_index('ux_question_topic_content_hash', table_name='question')
+
+    conn = op.get_bind()
+    seen = set()
+    updates = []
+    rows = conn.execution_options(stream_results=True, yield_per=1000).execute(
+        sa.text("SELECT id, topic_id, question, options FROM question ORDER BY topic_id, id")
+    )
+    for question_id, topic_id, question, options in rows:
+        if isinstance(options, str):
+            options = json.loads(options)
+        content_hash = _content_hash(question, options)
+        if (topic_id, content_hash) in seen:
+            content_hash = None
+        else:
+            seen.add((topic_id, content_hash))
+        updates.append({"id": question_id, "content_hash": content_hash})
+
+    if updates:
+        conn.execute(sa.text("UPDATE question SET content_hash = :content_hash WHERE id = :id"), updates)
+
+    op.create_index('ux_question_topic_content_hash', 'question', ['topic_id', 'content_hash'], unique=True)
+    op.create_index('ix_question_content_hash', 'question', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    # back to the raw text hashes of the previous revision
+    op.drop_index('ix_question_content_hash', table_name='question')
+    op.drop_index('ux_question_topic_content_hash', table_name='question')
+    op.execute("UPDATE question SET content_hash = NULL")
+    op.execute(
+        """
+        UPDATE question SET content_hash = encode(sha256(convert_to(question.question, 'UTF8')), 'hex')
+        FROM (
+            SELECT DISTINCT ON (topic_id, question) id FROM question ORDER BY topic_id, question, id
+        ) AS first_copy
+        WHERE question.id = first_copy.id
+        """
+    )
+    op.create_index('ux_question_topic_content_hash', 'question', ['topic_id', 'content_hash'], unique=True)
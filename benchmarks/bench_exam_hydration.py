@@ -0,0 +1,102 @@
+"""
+Queries and time spent assembling one exam with get_exam_full_repo.
+
+Builds synthetic 3-section exams of 50/500/5000 questions in an in-memory
+SQLite database and counts the statements each hydration issues, next to the
+old lazy-loading walk. Fails if the eager path's query count depends on size.
+
+Usage: python benchmarks/bench_exam_hydration.py
+"""
+import importlib
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, create_engine
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT.parent))
+
+models = importlib.import_module(f"{ROOT.name}.lib.models")
+exams = importlib.import_module(f"{ROOT.name}.src.repository.exams")
+
+SECTIONS = 3
+TOPICS = 10
+
+
+def seed_exam(db: Session, question_count: int) -> str:
+    topics = [models.Topic(name=f"Topic {uuid.uuid4().hex[:8]}", slug=uuid.uuid4().hex) for _ in range(TOPICS)]
+    db.add_all(topics)
+    db.flush()
+
+    exam_id = str(uuid.uuid4())
+    db.add(models.Exam(exam_id=exam_id, exam_title=f"{question_count} questions", exam_json_str="{}"))
+    sections = [models.ExamSection(id=str(uuid.uuid4()), name=f"Section {i}", exam_id=exam_id) for i in range(SECTIONS)]
+    db.add_all(sections)
+
+    for i in range(question_count):
+        question = models.Question(
+            id=str(uuid.uuid4()),
+            type=models.QuestionType.MCQ,
+            question=f"Question {i}",
+            options=[{"label": 1, "value": "a"}, {"label": 2, "value": "b"}],
+            answer_label=1,
+            topic_id=topics[i % TOPICS].topic_id,
+            explanation="",
+        )
+        db.add(question)
+        db.add(models.SectionQuestionLink(section_id=sections[i % SECTIONS].id, question_id=question.id))
+    db.commit()
+    return exam_id
+
+
+def lazy_walk(db: Session, exam_id: str) -> int:
+    # what get_exam_full_repo used to do: one lazy load per section and per question topic
+    exam = db.query(models.Exam).filter(models.Exam.exam_id == exam_id).first()
+    return sum(len([q.topic.name for q in section.questions]) for section in exam.sections)
+
+
+def measure(engine, fn, exam_id):
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        with Session(engine) as db:
+            start = time.perf_counter()
+            fn(db, exam_id)
+            elapsed = time.perf_counter() - start
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return statements, elapsed
+
+
+def main():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+
+    eager_counts = set()
+    for size in (50, 500, 5000):
+        with Session(engine) as db:
+            exam_id = seed_exam(db, size)
+
+        lazy_queries, lazy_s = measure(engine, lazy_walk, exam_id)
+        eager_queries, eager_s = measure(engine, exams.get_exam_full_repo, exam_id)
+        eager_counts.add(eager_queries)
+        print(
+            f"{size:>5} questions  lazy: {lazy_queries:>5} queries {lazy_s * 1000:8.1f} ms"
+            f"  eager: {eager_queries:>2} queries {eager_s * 1000:8.1f} ms"
+        )
+
+    assert len(eager_counts) == 1, f"eager hydration query count grows with exam size: {sorted(eager_counts)}"
+
+
+if __name__ == "__main__":
+    main()
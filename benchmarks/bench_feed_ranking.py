@@ -0,0 +1,69 @@
+"""
+Time to score and order feed candidates with feed_ranker.
+
+Builds synthetic candidates (ages over two weeks, a fifth of authors mutual
+friends, heavy tailed like and comment counts) and times score_candidates
+alone, then rank_candidates for the first feed page and for the full order.
+Fails if the median time to score and pick a page exceeds the budget.
+
+Usage: python benchmarks/bench_feed_ranking.py [candidates] [budget_ms]
+"""
+import importlib
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT.parent))
+
+feed_ranker = importlib.import_module(f"{ROOT.name}.src.repository.feed_ranker")
+
+REPEATS = 500
+AUTHORS = 2_000
+
+
+def synthetic_candidates(count: int, rng: np.random.Generator):
+    return feed_ranker.FeedCandidates(
+        post_ids=[f"post-{i}" for i in range(count)],
+        # newest first, as get_feed_candidates returns them
+        age_hours=np.sort(rng.uniform(0, 14 * 24, count)),
+        author_ids=rng.integers(1, AUTHORS, count, dtype=np.int64),
+        highlighted=rng.random(count) < 0.05,
+        likes=np.floor(rng.pareto(1.5, count) * 10),
+        comments=np.floor(rng.pareto(2.0, count) * 2),
+    )
+
+
+def timed(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    budget_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    rng = np.random.default_rng(7)
+
+    candidates = synthetic_candidates(count, rng)
+    mutual_ids = np.sort(rng.choice(np.arange(1, AUTHORS, dtype=np.int64), AUTHORS // 5, replace=False))
+
+    score_ms = timed(lambda: feed_ranker.score_candidates(candidates, mutual_ids), REPEATS)
+    full_ms = timed(lambda: feed_ranker.rank_candidates(candidates, mutual_ids), REPEATS)
+    page_ms = timed(lambda: feed_ranker.rank_candidates(candidates, mutual_ids, 0, 20), REPEATS)
+
+    print(f"{count} candidates, {len(mutual_ids)} mutual friends, median of {REPEATS} runs")
+    print(f"  score:                       {score_ms:7.3f} ms")
+    print(f"  rank_candidates, first page: {page_ms:7.3f} ms")
+    print(f"  rank_candidates, all ids:    {full_ms:7.3f} ms")
+    assert page_ms < budget_ms, f"ranking a page took {page_ms:.3f} ms, budget {budget_ms} ms"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Concurrent like/unlike storm on one hot post.
+
+Every worker thread double-taps like and unlike for a handful of users on the
+same post, the way a flaky client retries. Runs the old get-then-add/delete
+implementation and like_post_repo/unlike_post_repo, and reports failed calls,
+statements sent to the database and throughput. The new path must not fail.
+
+Defaults to a SQLite file. Point OUTSTAGRAM_BENCH_DATABASE_URL at a scratch
+Postgres database for realistic contention; its tables are created there.
+Usage: python benchmarks/bench_like_storm.py [threads] [rounds] [users]
+"""
+import importlib
+import os
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import event, delete
+from sqlalchemy.exc import SAWarning
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel, create_engine
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT.parent))
+
+models = importlib.import_module(f"{ROOT.name}.lib.models")
+schemas = importlib.import_module(f"{ROOT.name}.lib.schemas")
+posts = importlib.import_module(f"{ROOT.name}.src.repository.posts")
+
+
+def old_like(post_id, liker, db):
+    existing = db.get(models.PostLike, (post_id, liker.user_id))
+    if not existing:
+        like = models.PostLike(post_id=post_id, liker_user_id=liker.user_id)
+        db.add(like)
+        db.commit()
+        db.refresh(like)
+        return like
+    return existing
+
+
+def old_unlike(post_id, liker, db):
+    like = db.get(models.PostLike, (post_id, liker.user_id))
+    if like:
+        db.delete(like)
+        db.commit()
+        return True
+    return False
+
+
+def storm(engine, Session, like, unlike, post_id, users, threads, rounds):
+    statements = 0
+    errors = []
+    lock = threading.Lock()
+
+    def count(*args):
+        nonlocal statements
+        with lock:
+            statements += 1
+
+    def worker():
+        for _ in range(rounds):
+            for user in users:
+                for action in (like, like, unlike, unlike):
+                    db = Session()
+                    try:
+                        action(post_id, user, db)
+                    except Exception as e:
+                        db.rollback()
+                        with lock:
+                            errors.append(type(e).__name__)
+                    finally:
+                        db.close()
+
+    event.listen(engine, "before_cursor_execute", count)
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", count)
+    return elapsed, statements, errors
+
+
+def main():
+    # the old path deleting a row another thread already removed, that race is what is measured
+    warnings.filterwarnings("ignore", category=SAWarning)
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    user_count = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    url = os.getenv("OUTSTAGRAM_BENCH_DATABASE_URL") or f"sqlite:///{tempfile.mkdtemp()}/likes.db"
+    connect_args = {"timeout": 30, "check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args, pool_size=threads, max_overflow=0)
+    SQLModel.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    users = []
+    with Session() as db:
+        for i in range(user_count):
+            user = models.User(fullname=f"Liker {i}", username=f"liker_{time.time_ns()}_{i}", email=f"{i}@bench", password="x", date_of_birth=date(2000, 1, 1))
+            db.add(user)
+        author = models.User(fullname="Author", username=f"author_{time.time_ns()}", email="author@bench", password="x", date_of_birth=date(2000, 1, 1))
+        db.add(author)
+        db.flush()
+        post = models.Post(post_id=f"hot-{time.time_ns()}", caption="hot", post_category=models.PostCategory.vlog, author_user_id=author.user_id)
+        db.add(post)
+        db.commit()
+        users = [schemas.UserPublic(user_id=u.user_id, fullname=u.fullname, username=u.username, bio=None) for u in db.query(models.User).filter(models.User.user_id != author.user_id).limit(user_count)]
+        post_id = post.post_id
+
+    calls = threads * rounds * len(users) * 4
+    print(f"{threads} threads x {rounds} rounds x {len(users)} users x (like, like, unlike, unlike) = {calls} calls on one post")
+    for name, like, unlike in (("get-then-write", old_like, old_unlike), ("upsert", posts.like_post_repo, posts.unlike_post_repo)):
+        with Session() as db:
+            db.execute(delete(models.PostLike).where(models.PostLike.post_id == post_id))
+            db.commit()
+        elapsed, statements, errors = storm(engine, Session, like, unlike, post_id, users, threads, rounds)
+        kinds = ", ".join(sorted(set(errors))) or "-"
+        print(
+            f"{name:>15}: {len(errors):5} errors ({kinds})  {statements / calls:5.2f} statements/call"
+            f"  {calls / elapsed:8.0f} calls/s"
+        )
+        if name == "upsert":
+            assert not errors, f"upsert path failed {len(errors)} calls"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Feed latency while a burst of logins is being verified.
+
+Runs two tiny ASGI apps in-process with the same /feed handler (a 2 ms simulated
+query on the threadpool) and a /login handler that verifies an Argon2 hash:
+
+- inline: the old shape, `async def login` calling argon2 on the event loop
+- pooled: `def login` going through auth.verify_password and its bounded pool
+
+Usage: python benchmarks/bench_login_burst.py [logins] [feed_requests]
+"""
+import asyncio
+import importlib
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT.parent))
+auth = importlib.import_module(f"{ROOT.name}.src.repository.auth")
+from fastapi import HTTPException  # noqa: E402
+
+HASH = auth.ph.hash("correct horse battery staple")
+
+
+def build_app(pooled: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/feed")
+    def feed():
+        time.sleep(0.002)
+        return []
+
+    if pooled:
+        @app.post("/login")
+        def login():
+            return {"ok": auth.verify_password("correct horse battery staple", HASH)}
+    else:
+        @app.post("/login")
+        async def login():
+            return {"ok": auth._verify(HASH, "correct horse battery staple")}
+
+    return app
+
+
+async def run(app: FastAPI, logins: int, feeds: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies = []
+        rejected = 0
+
+        # latency is measured from when the request was due, not from when the
+        # loop got around to sending it, so a blocked loop shows up in the numbers
+        async def one_feed(due: float):
+            await client.get("/feed")
+            latencies.append((time.perf_counter() - due) * 1000)
+
+        async def one_login():
+            nonlocal rejected
+            response = await client.post("/login")
+            if response.status_code == 503:
+                rejected += 1
+
+        async def feed_stream():
+            tasks = []
+            first = time.perf_counter()
+            for i in range(feeds):
+                due = first + i * 0.005
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                tasks.append(asyncio.create_task(one_feed(due)))
+            await asyncio.gather(*tasks)
+
+        start = time.perf_counter()
+        await asyncio.gather(feed_stream(), *(one_login() for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "feed_p50_ms": statistics.median(latencies),
+        "feed_p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+        "logins_rejected": rejected,
+        "wall_s": elapsed,
+    }
+
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    feeds = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    print(f"{logins} logins burst alongside {feeds} /feed requests "
+          f"(argon2 t={auth.ARGON2_TIME_COST} m={auth.ARGON2_MEMORY_COST}KiB p={auth.ARGON2_PARALLELISM}, "
+          f"{auth.PASSWORD_WORKERS} workers, queue {auth.PASSWORD_QUEUE_DEPTH})")
+    for name, pooled in (("inline", False), ("pooled", True)):
+        result = asyncio.run(run(build_app(pooled), logins, feeds))
+        print(f"{name:>7}: feed p50 {result['feed_p50_ms']:7.2f} ms  p99 {result['feed_p99_ms']:7.2f} ms  "
+              f"logins rejected {result['logins_rejected']:3d}  wall {result['wall_s']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
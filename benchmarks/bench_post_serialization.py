@@ -0,0 +1,140 @@
+"""
+CPU time and peak allocations per feed page, old serialization path vs post_dicts.
+
+The old path loads ORM Post rows, model_dump()s them into validated PostPublic
+objects, then validates and encodes once more the way FastAPI does for a
+response_model. The new path builds plain dicts from column tuples and encodes
+them with ORJSONResponse. Both bodies must decode to the same JSON.
+
+Runs against an in-memory SQLite database; presigning is replaced by the
+identity so that S3 is not involved (it is cached and the same in both paths).
+Usage: python benchmarks/bench_post_serialization.py [pages] [page_length]
+"""
+import importlib
+import json
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import date
+from pathlib import Path
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, create_engine, select
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT.parent))
+
+models = importlib.import_module(f"{ROOT.name}.lib.models")
+schemas = importlib.import_module(f"{ROOT.name}.lib.schemas")
+posts = importlib.import_module(f"{ROOT.name}.src.repository.posts")
+
+MEDIA_PER_POST = 2
+
+
+def seed(db: Session, count: int) -> List[str]:
+    author = models.User(fullname="Author", username="author", email="a@bench", password="x", date_of_birth=date(2000, 1, 1))
+    db.add(author)
+    db.flush()
+    post_ids = []
+    for i in range(count):
+        post_id = str(uuid.uuid4())
+        db.add(models.Post(post_id=post_id, caption=f"caption {i} " * 8, post_category=models.PostCategory.vlog, author_user_id=author.user_id, like_count=i))
+        db.add_all(models.MediaURL(post_id=post_id, url=f"media/{post_id}/{j}.jpg", media_type="image") for j in range(MEDIA_PER_POST))
+        if i % 3 == 0:
+            db.add(models.PostLike(post_id=post_id, liker_user_id=author.user_id))
+        post_ids.append(post_id)
+    db.commit()
+    return post_ids
+
+
+def old_hydrate(post_ids, current_user, db):
+    # hydrate_posts before the column only path
+    rows = db.execute(
+        select(models.Post, models.User.username)
+        .join(models.User, models.Post.author_user_id == models.User.user_id)
+        .where(models.Post.post_id.in_(post_ids))
+    ).all()
+    liked = set(db.scalars(
+        select(models.PostLike.post_id)
+        .where(models.PostLike.liker_user_id == current_user.user_id, models.PostLike.post_id.in_(post_ids))
+    ).all())
+    media_by_post = {}
+    for media in db.scalars(select(models.MediaURL).where(models.MediaURL.post_id.in_(post_ids))).all():
+        media_by_post.setdefault(media.post_id, []).append(media)
+    posts_by_id = {
+        post.post_id: schemas.PostPublic(
+            **post.model_dump(exclude={"datetime_posted"}),
+            author=username,
+            datetime_posted=post.datetime_posted.isoformat(),
+            media_urls=posts.sign_media_urls(media_by_post.get(post.post_id, [])),
+            is_liked=post.post_id in liked,
+        )
+        for post, username in rows
+    }
+    return [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id]
+
+
+response_adapter = TypeAdapter(List[schemas.PostPublic])
+
+
+def old_page(post_ids, current_user, db) -> bytes:
+    items = old_hydrate(post_ids, current_user, db)
+    # what FastAPI does with a response_model: dump, validate again, dump to JSON types, json.dumps
+    validated = response_adapter.validate_python([item.model_dump() for item in items])
+    return JSONResponse(response_adapter.dump_python(validated, mode="json")).body
+
+
+def new_page(post_ids, current_user, db) -> bytes:
+    return ORJSONResponse(posts.post_dicts(post_ids, current_user, db)).body
+
+
+def measure(page, pages, post_ids, current_user, db):
+    db.expunge_all()
+    start = time.process_time()
+    for _ in range(pages):
+        page(post_ids, current_user, db)
+        db.expunge_all()
+    cpu_ms = (time.process_time() - start) / pages * 1000
+
+    tracemalloc.start()
+    page(post_ids, current_user, db)
+    db.expunge_all()
+    tracemalloc.reset_peak()
+    page(post_ids, current_user, db)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.expunge_all()
+    return cpu_ms, peak
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    page_length = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    posts.presign = lambda key: key
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+
+    with Session(engine) as db:
+        post_ids = seed(db, page_length)
+        author = db.scalars(select(models.User)).first()
+        current_user = schemas.UserPublic(user_id=author.user_id, fullname=author.fullname, username=author.username, bio=None)
+
+        assert json.loads(old_page(post_ids, current_user, db)) == json.loads(new_page(post_ids, current_user, db)), "bodies differ"
+
+        print(f"{pages} pages of {page_length} posts, {MEDIA_PER_POST} media each")
+        results = {}
+        for name, page in (("orm + pydantic", old_page), ("tuples + orjson", new_page)):
+            results[name] = cpu_ms, peak = measure(page, pages, post_ids, current_user, db)
+            print(f"{name:>16}: {cpu_ms:7.3f} ms CPU/page  {peak / 1024:8.1f} KiB allocated at peak")
+        old_ms, new_ms = results["orm + pydantic"][0], results["tuples + orjson"][0]
+        print(f"{old_ms / new_ms:.1f}x less CPU per page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Cost of drawing one question paper from a topic as the bank grows.
+
+Both sides run against the same database and return the same Question rows:
+the old `ORDER BY random() LIMIT k` query, which keys and sorts the whole topic,
+and sample_questions_from_topic's path, an O(k) draw from QuestionSampler's id
+pools followed by one `WHERE id IN (...)` read. The pools are loaded on a
+topic's first draw (and again after the TTL); that warm-up is timed on its own
+and reported next to the number of draws it takes to pay for itself.
+
+Defaults to a SQLite file. Point OUTSTAGRAM_BENCH_DATABASE_URL at a scratch
+Postgres database for realistic numbers; its tables are created there.
+Usage: python benchmarks/bench_question_sampling.py [k] [rounds] [topic sizes...]
+"""
+import importlib
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel, create_engine
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT.parent))
+
+models = importlib.import_module(f"{ROOT.name}.lib.models")
+question_sampler = importlib.import_module(f"{ROOT.name}.src.repository.question_sampler")
+
+DIFFICULTIES = ("easy", "medium", "hard")
+INSERT_BATCH = 10_000
+
+
+def seed_topic(db, size: int) -> int:
+    topic = models.Topic(name=f"Bench {uuid.uuid4().hex[:8]}", slug=uuid.uuid4().hex)
+    db.add(topic)
+    db.flush()
+    for start in range(0, size, INSERT_BATCH):
+        db.execute(insert(models.Question), [
+            {
+                "id": str(uuid.uuid4()),
+                "type": models.QuestionType.MCQ,
+                "difficulty": DIFFICULTIES[i % 3],
+                "question": f"Question {i}",
+                "options": [{"label": 1, "value": "a"}, {"label": 2, "value": "b"}],
+                "answer_label": 1,
+                "topic_id": topic.topic_id,
+                "explanation": "",
+            }
+            for i in range(start, min(start + INSERT_BATCH, size))
+        ])
+    db.commit()
+    return topic.topic_id
+
+
+def order_by_random(db, sampler, topic_id: int, k: int):
+    # what sample_questions_from_topic ran before the pools
+    return db.execute(
+        select(models.Question).where(models.Question.topic_id == topic_id).order_by(func.random()).limit(k)
+    ).scalars().all()
+
+
+def pooled_draw(db, sampler, topic_id: int, k: int):
+    ids = sampler.sample(db, topic_id, k)
+    return db.execute(select(models.Question).where(models.Question.id.in_(ids))).scalars().all()
+
+
+def timed(fn, Session, sampler, topic_id: int, k: int, rounds: int) -> float:
+    with Session() as db:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            rows = fn(db, sampler, topic_id, k)
+            db.expunge_all()
+        elapsed = (time.perf_counter() - start) / rounds
+    assert len(rows) == k, f"{fn.__name__} returned {len(rows)} rows"
+    return elapsed
+
+
+def main():
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    sizes = [int(size) for size in sys.argv[3:]] or [10_000, 100_000, 1_000_000]
+
+    url = os.getenv("OUTSTAGRAM_BENCH_DATABASE_URL") or f"sqlite:///{tempfile.mkdtemp()}/questions.db"
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    print(f"{engine.url.get_backend_name()}, k={k}, mean of {rounds} draws")
+
+    for size in sizes:
+        with Session() as db:
+            topic_id = seed_topic(db, size)
+
+        # warm-up: a fresh sampler's first draw loads the topic's pools
+        sampler = question_sampler.QuestionSampler()
+        with Session() as db:
+            start = time.perf_counter()
+            sampler.sample(db, topic_id, k)
+            warm_up_s = time.perf_counter() - start
+
+        random_s = timed(order_by_random, Session, sampler, topic_id, k, rounds)
+        pooled_s = timed(pooled_draw, Session, sampler, topic_id, k, rounds)
+        break_even = warm_up_s / (random_s - pooled_s) if random_s > pooled_s else float("inf")
+        print(
+            f"{size:>9,} questions  order by random: {random_s * 1000:8.2f} ms"
+            f"  pooled: {pooled_s * 1000:6.2f} ms ({random_s / pooled_s:,.0f}x)"
+            f"  pool warm-up: {warm_up_s * 1000:8.2f} ms, repaid after {break_even:,.1f} draws"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Throughput of /media-upload/bulk against a local S3 stand-in (moto).
+
+moto answers in microseconds, so every S3 request is delayed by a simulated
+round trip (--rtt-ms) to make the serial vs parallel difference visible.
+Compares the old one-after-another loop with upload_media_bulk_to_s3.
+
+Needs `pip install "moto[s3]"`.
+Usage: python benchmarks/bench_s3_bulk_upload.py [files] [size_mb] [rtt_ms]
+"""
+import importlib
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+from moto import mock_aws
+from starlette.datastructures import Headers, UploadFile
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("S3_BUCKET", "outstagram-bench")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT.parent))
+
+
+def make_files(count: int, size_mb: float):
+    payload = os.urandom(int(size_mb * 1024 * 1024))
+    return [
+        UploadFile(file=io.BytesIO(payload), filename=f"bench-{i}.mp4", headers=Headers({"content-type": "video/mp4"}))
+        for i in range(count)
+    ]
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    size_mb = float(sys.argv[2]) if len(sys.argv) > 2 else 2
+    rtt_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 40
+
+    with mock_aws():
+        import boto3
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=os.environ["S3_BUCKET"])
+        media = importlib.import_module(f"{ROOT.name}.src.repository.media")
+
+        def simulated_round_trip(**kwargs):
+            time.sleep(rtt_ms / 1000)
+
+        media.s3_client.meta.events.register("before-sign.s3.*", simulated_round_trip)
+
+        total_mb = files * size_mb
+        print(f"{files} files x {size_mb} MB, {rtt_ms} ms simulated RTT per S3 request")
+
+        start = time.perf_counter()
+        for upload in make_files(files, size_mb):
+            media.upload_media_to_s3(upload, None)
+        serial = time.perf_counter() - start
+        print(f" serial: {serial:6.2f} s  {total_mb / serial:7.1f} MB/s")
+
+        start = time.perf_counter()
+        media.upload_media_bulk_to_s3(make_files(files, size_mb), None)
+        parallel = time.perf_counter() - start
+        print(f"   bulk: {parallel:6.2f} s  {total_mb / parallel:7.1f} MB/s  ({serial / parallel:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
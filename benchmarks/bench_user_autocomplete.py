@@ -0,0 +1,48 @@
+"""
+Prefix query latency of the in-memory user search trie.
+
+Fills a UserSearchIndex with synthetic users (random usernames and two word
+full names, skewed follower counts) and times prefix queries of 1 to 4
+characters, the way type-ahead sends them. No database is involved.
+
+Usage: python benchmarks/bench_user_autocomplete.py [users] [queries]
+"""
+import importlib
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT.parent))
+
+user_search = importlib.import_module(f"{ROOT.name}.src.repository.user_search")
+
+
+def random_word(low: int, high: int) -> str:
+    return "".join(random.choices(string.ascii_lowercase, k=random.randint(low, high)))
+
+
+def main():
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    random.seed(7)
+
+    index = user_search.UserSearchIndex()
+    index.ready = True
+    start = time.perf_counter()
+    for user_id in range(user_count):
+        followers = int(random.paretovariate(1.2)) - 1
+        index.add(user_id, f"{random_word(4, 10)}{user_id}", f"{random_word(3, 8)} {random_word(4, 10)}", followers)
+    print(f"built {user_count} users in {time.perf_counter() - start:.1f}s")
+
+    prefixes = [random_word(1, 4) for _ in range(query_count)]
+    start = time.perf_counter()
+    hits = sum(len(index.search(prefix, index.top_k)) for prefix in prefixes)
+    elapsed = time.perf_counter() - start
+    print(f"{query_count} prefix queries: {elapsed / query_count * 1e6:.2f} us/query, {hits / query_count:.1f} results on average")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable
+import hashlib
+import json
+import time
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+
+class LRUCache:
+    """
+    A small thread safe LRU map, shared by the in-process caches.
+    Least recently used entries are dropped once maxsize is reached.
+    Every entry counts as 1 towards maxsize, unless a weigh function is given
+    (e.g. `len` of the cached bytes, making maxsize a byte budget).
+    """
+
+    def __init__(self, maxsize: int, weigh: Callable[[Any], int] | None = None):
+        self.maxsize = maxsize
+        self.weight = 0
+        self._weigh = weigh or (lambda value: 1)
+        self._data: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+                return self._data[key]
+            except KeyError:
+                return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        weight = self._weigh(value)
+        with self._lock:
+            if key in self._data:
+                self.weight -= self._weigh(self._data.pop(key))
+            if weight > self.maxsize:
+                return
+            self._data[key] = value
+            self.weight += weight
+            while self.weight > self.maxsize:
+                _, evicted = self._data.popitem(last=False)
+                self.weight -= self._weigh(evicted)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            value = self._data.pop(key)
+            self.weight -= self._weigh(value)
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class VersionedCache:
+    """
+    A TTL cache where every entry is tagged with the version it was built under.
+    invalidate() bumps the version, which makes every existing entry stale at once.
+    The TTL bounds staleness for writes made by other worker processes.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 256):
+        self.ttl = ttl
+        self.version = 0
+        self._entries = LRUCache(maxsize=maxsize)
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        version, expires_at, value = entry
+        if version != self.version or time.monotonic() > expires_at:
+            self._entries.pop(key)
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any, version: int | None = None) -> None:
+        # `version` is the one read before building the value, a build an invalidate() overtook is dropped
+        if version is None:
+            version = self.version
+        elif version != self.version:
+            return
+        self._entries.set(key, (version, time.monotonic() + self.ttl, value))
+
+    def invalidate(self) -> None:
+        self.version += 1
+
+
+def cached_json_response(request: Request, cache: VersionedCache, key: Hashable, build: Callable[[], Any]) -> Response:
+    # Serve JSON from cache with an ETag, a matching If-None-Match gets an empty 304
+    entry = cache.get(key)
+    if entry is None:
+        version = cache.version
+        body = json.dumps(jsonable_encoder(build()), separators=(",", ":")).encode()
+        entry = (body, f'"{hashlib.sha1(body).hexdigest()}"')
+        cache.set(key, entry, version)
+    body, etag = entry
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match", "")
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def accepts_gzip(request: Request) -> bool:
+    return any(
+        coding.split(";")[0].strip() == "gzip" and not coding.replace(" ", "").endswith(";q=0")
+        for coding in request.headers.get("accept-encoding", "").split(",")
+    )
@@ -2,3 +2,9 @@ LIKE_PAGE_LENGTH = 10
 COMMENT_PAGE_LENGTH = 10
 USER_POSTS_PAGE_LENGTH = 10
 FEED_PAGE_LENGTH = 20
+# how many of an author's latest posts land in a new follower's timeline
+TIMELINE_BACKFILL_LENGTH = 200
+# most post ids one GET /posts?ids= call may ask for
+POSTS_BATCH_LIMIT = 50
+# results per page of post and question search
+SEARCH_PAGE_LENGTH = 20
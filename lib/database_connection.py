@@ -1,6 +1,11 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from .pool_metrics import PoolMetrics, timed_pool, instrument_engine
+from .replicas import ReplicaSet, RecentWriters, RoutingSession
 from os import getenv
 
 DB_USERNAME = getenv("OUTSTAGRAM_USERNAME", "")
@@ -9,11 +14,89 @@ DB_NAME = getenv("OUTSTAGRAM_DBNAME", "outsie")
 DB_HOST = getenv("OUTSTAGRAM_DBHOST", "localhost")
 
 DATABASE_URL = f"postgresql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}?sslmode=require"
+# asyncpg spells sslmode as ssl
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}?ssl=require"
+
+# Pool sizing, per engine (sync and async each get their own pool of this size)
+DB_POOL_SIZE = int(getenv("OUTSTAGRAM_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(getenv("OUTSTAGRAM_DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(getenv("OUTSTAGRAM_DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(getenv("OUTSTAGRAM_DB_POOL_RECYCLE", "3600"))
+# "always" pings on every checkout, "idle" only connections idle for DB_PRE_PING_IDLE_SECONDS, "never" doesn't
+DB_PRE_PING = getenv("OUTSTAGRAM_DB_PRE_PING", "idle")
+DB_PRE_PING_IDLE_SECONDS = float(getenv("OUTSTAGRAM_DB_PRE_PING_IDLE_SECONDS", "30"))
+# 0 leaves statements without a server side time limit
+DB_STATEMENT_TIMEOUT_MS = int(getenv("OUTSTAGRAM_DB_STATEMENT_TIMEOUT_MS", "0"))
+
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+
+
+def _pool_options(base_pool, metrics: PoolMetrics) -> dict:
+    return {
+        "poolclass": timed_pool(base_pool, metrics),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_PRE_PING == "always",
+    }
+
+
+_connect_args = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"} if DB_STATEMENT_TIMEOUT_MS else {}
 
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=3600,
+    connect_args=_connect_args,
+    **_pool_options(QueuePool, sync_pool_metrics),
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Read replicas, comma separated hosts sharing the primary's credentials and database name
+DB_REPLICA_HOSTS = [host.strip() for host in getenv("OUTSTAGRAM_DB_REPLICA_HOSTS", "").split(",") if host.strip()]
+DB_REPLICA_EJECT_SECONDS = float(getenv("OUTSTAGRAM_DB_REPLICA_EJECT_SECONDS", "30"))
+# How long a user's reads stay on the primary after they write, should exceed the replication lag
+DB_READ_YOUR_WRITES_SECONDS = float(getenv("OUTSTAGRAM_DB_READ_YOUR_WRITES_SECONDS", "5"))
+
+replica_pool_metrics = [PoolMetrics(f"replica:{host}") for host in DB_REPLICA_HOSTS]
+replica_engines = [
+    create_engine(
+        f"postgresql://{DB_USERNAME}:{DB_PASSWORD}@{host}/{DB_NAME}?sslmode=require",
+        connect_args=_connect_args,
+        **_pool_options(QueuePool, metrics),
+    )
+    for host, metrics in zip(DB_REPLICA_HOSTS, replica_pool_metrics)
+]
+replica_set = ReplicaSet(replica_engines, eject_seconds=DB_REPLICA_EJECT_SECONDS) if replica_engines else None
+recent_writers = RecentWriters(ttl=DB_READ_YOUR_WRITES_SECONDS)
+
+# Sessions opened with info={"read_only": True} read from the replicas, see RoutingSession
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    replicas=replica_set,
+    recent_writers=recent_writers,
+)
+
+# Non-blocking twin of the engine above, for repositories that run on the event loop
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args={"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}} if DB_STATEMENT_TIMEOUT_MS else {},
+    **_pool_options(AsyncAdaptedQueuePool, async_pool_metrics),
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+_ping_idle_seconds = DB_PRE_PING_IDLE_SECONDS if DB_PRE_PING == "idle" else None
+instrument_engine(engine, sync_pool_metrics, _ping_idle_seconds)
+instrument_engine(async_engine.sync_engine, async_pool_metrics, _ping_idle_seconds)
+for replica, metrics in zip(replica_engines, replica_pool_metrics):
+    instrument_engine(replica, metrics, _ping_idle_seconds)
 Base = declarative_base()
+
+
+# INSERT construct of the session's dialect, for ON CONFLICT clauses (Postgres, SQLite in local runs)
+def dialect_insert(db: Session, model):
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
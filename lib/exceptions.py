@@ -39,3 +39,19 @@ class CouldntInitS3(HTTPException):
     def __init__(self, detail: str = "We couldnt get the media for this post"):
         super().__init__(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=detail)
 
+
+class InvalidCursor(HTTPException):
+    def __init__(self, detail: str = "The page cursor in the request is invalid"):
+        super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+class PasswordWorkersBusy(HTTPException):
+    def __init__(self, detail: str = "Too many logins in progress, please retry shortly"):
+        super().__init__(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detail, headers={"Retry-After": "1"})
+
+class InvalidQuestionLine(HTTPException):
+    def __init__(self, detail: str = "A line of the question import is not a valid question"):
+        super().__init__(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail)
+
+class InvalidBatchSize(HTTPException):
+    def __init__(self, detail: str = "The request must name at least one post id, and not more than the batch limit"):
+        super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
@@ -2,7 +2,7 @@ from datetime import date, datetime
 from enum import Enum
 from typing import List, Optional
 from sqlmodel import Field, Relationship, SQLModel, create_engine, select
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, JSON, Index
 
 
 class User(SQLModel, table=True):
@@ -13,6 +13,10 @@ class User(SQLModel, table=True):
     email: str = Field(nullable=False, unique=True, index = True)
     bio: Optional[str] = None
     date_of_birth: Optional[date] = None
+    # denormalized counters, maintained through the write-behind buffer in src/repository/counters.py
+    posts_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    followers_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    following_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
     posts: List["Post"] = Relationship(
         back_populates="author",
         cascade_delete= True
@@ -75,6 +79,8 @@ class Post(SQLModel, table=True):
         back_populates="posts",
     )
     highlighted_by_author: bool = Field(default=False)
+    like_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    comment_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
 
     comments: List["PostComment"] = Relationship(
         back_populates="post",
@@ -89,6 +95,10 @@ class Post(SQLModel, table=True):
         cascade_delete= True
     )
 
+    __table_args__ = (
+        Index("ix_post_author_posted", "author_user_id", "datetime_posted", "post_id"),
+    )
+
 class MediaURL(SQLModel, table=True):
 
     post_id: Optional[str] = Field(default=None, foreign_key="post.post_id", primary_key = True, ondelete= "CASCADE")
@@ -99,6 +109,17 @@ class MediaURL(SQLModel, table=True):
         back_populates="media_urls",
     )
 
+class TimelineEntry(SQLModel, table=True):
+    # materialized feed: one row per (follower, post), written when the post is created
+    owner_user_id: int = Field(foreign_key="user.user_id", primary_key=True, ondelete="CASCADE")
+    post_id: str = Field(foreign_key="post.post_id", primary_key=True, ondelete="CASCADE")
+    author_user_id: int = Field(foreign_key="user.user_id", ondelete="CASCADE")
+    datetime_posted: datetime = Field(nullable=False)
+
+    __table_args__ = (
+        Index("ix_timelineentry_owner_posted", "owner_user_id", "datetime_posted", "post_id"),
+    )
+
 class PostComment(SQLModel, table=True):
     comment_id: Optional[int] = Field(default=None, primary_key=True)
     post_id: Optional[str] = Field(default=None, foreign_key="post.post_id", ondelete= "CASCADE")
@@ -113,6 +134,10 @@ class PostComment(SQLModel, table=True):
     datetime_commented: datetime = Field(default_factory=datetime.utcnow)
     likes: List["PostCommentLike"] = Relationship(back_populates="comment")
 
+    __table_args__ = (
+        Index("ix_postcomment_post_comment", "post_id", "comment_id"),
+    )
+
 class PostLike(SQLModel, table=True):
     post_id: str = Field(foreign_key="post.post_id", primary_key=True, index = True, ondelete= "CASCADE")
     post: Post = Relationship(
@@ -124,6 +149,10 @@ class PostLike(SQLModel, table=True):
     )
     datetime_liked: datetime = Field(default_factory=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_postlike_post_liked", "post_id", "datetime_liked", "liker_user_id"),
+    )
+
 class PostCommentLike(SQLModel, table=True):
     comment_id: int = Field(foreign_key="postcomment.comment_id", primary_key=True, ondelete= "CASCADE")
     comment: PostComment = Relationship(
@@ -179,6 +208,10 @@ class Exam(SQLModel, table=True):
     datetime_uploaded: datetime = Field(default_factory=datetime.utcnow)
     sections: List["ExamSection"] = Relationship(back_populates="exam", cascade_delete=True)
 
+    __table_args__ = (
+        Index("ix_exam_uploaded", "datetime_uploaded", "exam_id"),
+    )
+
 
 class QuestionType(str, Enum):
     MCQ = "MCQ"
@@ -232,8 +265,17 @@ class Question(SQLModel, table=True):
     topic: Topic = Relationship(back_populates="questions")
     explanation: str = Field(nullable=False)
     image_path: Optional[str] = None
+    # sha256 of the normalized text and options (question_ingest.question_content_hash), unique per topic.
+    # NULL for rows appended as allowed duplicates
+    content_hash: Optional[str] = Field(default=None, max_length=64)
     sections: List["ExamSection"] = Relationship(back_populates="questions", link_model=SectionQuestionLink)
 
+    __table_args__ = (
+        Index("ux_question_topic_content_hash", "topic_id", "content_hash", unique=True),
+        # the same question filed under several topics
+        Index("ix_question_content_hash", "content_hash"),
+    )
+
 
 class ExamSection(SQLModel, table=True):
     id: str = Field(primary_key=True)
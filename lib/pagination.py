@@ -0,0 +1,29 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Tuple
+
+from .exceptions import InvalidCursor
+
+
+# Cursors are opaque to clients: a urlsafe base64 of the sort key of the last row served.
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+# Decode a cursor back into a sort key, casting each part to the expected type
+def decode_cursor(cursor: str, types: Tuple[type, ...]) -> Tuple[Any, ...]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise InvalidCursor
+        return tuple(
+            datetime.fromisoformat(v) if t is datetime else t(v)
+            for v, t in zip(values, types)
+        )
+    except InvalidCursor:
+        raise
+    except Exception:
+        raise InvalidCursor
@@ -0,0 +1,112 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DisconnectionError, TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+from bisect import bisect_left
+from threading import Lock
+import time
+
+# Upper bounds (ms) of the checkout wait histogram buckets, the last bucket is unbounded
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolMetrics:
+    """
+    Counters for one connection pool, fed by the pool events and by the time
+    spent waiting for a connection in the pool class built by timed_pool().
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self.stale_on_ping = 0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    def observe_wait(self, waited_ms: float) -> None:
+        with self._lock:
+            self.wait_buckets[bisect_left(WAIT_BUCKETS_MS, waited_ms)] += 1
+            self.wait_total_ms += waited_ms
+            self.wait_max_ms = max(self.wait_max_ms, waited_ms)
+
+    def incr(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, pool: QueuePool | None = None) -> dict:
+        with self._lock:
+            waits = sum(self.wait_buckets)
+            return {
+                "pool": self.name,
+                "size": pool.size() if pool else None,
+                "checked_out": pool.checkedout() if pool else None,
+                "overflow": pool.overflow() if pool else None,
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "overflow_events": self.overflow_events,
+                "timeouts": self.timeouts,
+                "stale_on_ping": self.stale_on_ping,
+                "wait_ms": {
+                    "count": waits,
+                    "mean": self.wait_total_ms / waits if waits else 0.0,
+                    "max": self.wait_max_ms,
+                    "buckets": {
+                        **{f"le_{bound}": count for bound, count in zip(WAIT_BUCKETS_MS, self.wait_buckets)},
+                        "inf": self.wait_buckets[-1],
+                    },
+                },
+            }
+
+
+def timed_pool(base: type[QueuePool], metrics: PoolMetrics) -> type[QueuePool]:
+    # A subclass is used instead of an attribute on the pool, so pools recreated
+    # by engine.dispose() keep reporting to the same metrics
+    class TimedPool(base):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except PoolTimeout:
+                metrics.incr("timeouts")
+                raise
+            finally:
+                metrics.observe_wait((time.perf_counter() - start) * 1000)
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+def instrument_engine(engine: Engine, metrics: PoolMetrics, ping_idle_seconds: float | None = None) -> None:
+    # ping_idle_seconds: ping only connections that sat idle in the pool that long, instead
+    # of pool_pre_ping's round trip on every checkout. None disables it.
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.incr("connects")
+        pool = engine.pool
+        # a connection opened while the pool is already at its size comes from max_overflow
+        if pool.checkedout() > pool.size():
+            metrics.incr("overflow_events")
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.incr("checkouts")
+        if ping_idle_seconds is None:
+            return
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < ping_idle_seconds:
+            return
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except Exception:
+            metrics.incr("stale_on_ping")
+            # makes the pool throw this connection away and hand out a fresh one
+            raise DisconnectionError()
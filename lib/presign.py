@@ -0,0 +1,47 @@
+import time
+from os import getenv
+from urllib.parse import urlparse, unquote
+
+from .cache import LRUCache
+from .s3_client import S3ClientManager, S3_BUCKET
+
+# Media rows store the bare object key, URLs are signed when a response is built.
+# A signature is reused for the whole expiry bucket it was made in, so a hot
+# object costs one signing per bucket, and every read path hands out the same URL.
+PRESIGN_EXPIRES_SECONDS = 604800  # 7 days, the SigV4 maximum
+PRESIGN_BUCKET_SECONDS = int(getenv("S3_PRESIGN_BUCKET_SECONDS", "86400"))
+PRESIGN_CACHE_SIZE = int(getenv("S3_PRESIGN_CACHE_SIZE", "50000"))
+
+_presigned_urls = LRUCache(maxsize=PRESIGN_CACHE_SIZE)
+
+
+def object_key_from_url(url: str, bucket: str | None = S3_BUCKET) -> str:
+    # Turn a (presigned) URL pointing into our bucket back into its object key.
+    # Bare keys and URLs to anywhere else come back unchanged.
+    parsed = urlparse(url)
+    if not parsed.scheme or not bucket:
+        return url
+    path = unquote(parsed.path).lstrip("/")
+    if parsed.netloc.startswith(f"{bucket}."):
+        return path
+    if path.startswith(f"{bucket}/"):
+        return path[len(bucket) + 1:]
+    return url
+
+
+def presign(object_key: str) -> str:
+    # external media is stored as a full URL, there is nothing to sign
+    if object_key.startswith(("http://", "https://")):
+        return object_key
+
+    # a URL signed anywhere in the bucket stays valid for (expiry - bucket) after it closes
+    cache_key = (object_key, int(time.time() // PRESIGN_BUCKET_SECONDS))
+    url = _presigned_urls.get(cache_key)
+    if url is None:
+        url = S3ClientManager.get_client().generate_presigned_url(
+            'get_object',
+            Params={'Bucket': S3ClientManager.get_bucket(), 'Key': object_key},
+            ExpiresIn=PRESIGN_EXPIRES_SECONDS,
+        )
+        _presigned_urls.set(cache_key, url)
+    return url
@@ -0,0 +1,113 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from .cache import LRUCache
+from itertools import count
+from threading import Lock
+from typing import List
+import time
+
+
+class ReplicaSet:
+    """
+    Round-robin over the read replica engines. A replica that drops or refuses
+    connections is ejected for eject_seconds, then offered again by choose().
+    """
+
+    def __init__(self, engines: List[Engine], eject_seconds: float = 30):
+        self.engines = list(engines)
+        self.eject_seconds = eject_seconds
+        self._ejected_until = {}
+        self._turn = count()
+        self._lock = Lock()
+        for replica in self.engines:
+            event.listen(replica, "handle_error", self._on_error)
+
+    def choose(self) -> Engine | None:
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            replica = self.engines[next(self._turn) % len(self.engines)]
+            if self._ejected_until.get(replica, 0) <= now:
+                return replica
+        return None
+
+    def eject(self, replica: Engine) -> None:
+        with self._lock:
+            self._ejected_until[replica] = time.monotonic() + self.eject_seconds
+        print(f"Ejected read replica {_label(replica)} for {self.eject_seconds}s")
+
+    def _on_error(self, context) -> None:
+        # lost connections, and failures to connect at all (no connection yet)
+        if context.is_disconnect or context.connection is None:
+            self.eject(context.engine)
+
+    def status(self) -> List[dict]:
+        now = time.monotonic()
+        return [
+            {"host": _label(replica), "ejected_for": max(0.0, self._ejected_until.get(replica, 0) - now)}
+            for replica in self.engines
+        ]
+
+
+def _label(replica: Engine) -> str:
+    return replica.url.host or replica.url.database
+
+
+class RecentWriters:
+    """
+    Users who committed a write in the last `ttl` seconds. Their reads stay on the
+    primary for that long, so they see their own writes despite replication lag.
+    Per process, so the ttl should cover the replica lag, not just one worker.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 100_000):
+        self.ttl = ttl
+        self._until = LRUCache(maxsize=maxsize)
+
+    def note(self, user_id) -> None:
+        self._until.set(user_id, time.monotonic() + self.ttl)
+
+    def __contains__(self, user_id) -> bool:
+        return user_id is not None and self._until.get(user_id, 0) > time.monotonic()
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to a replica when its `info["read_only"]` is set, and
+    everything else to the primary bind: flushes, INSERT/UPDATE/DELETE statements,
+    any statement after the session wrote, and reads of users in recent_writers
+    (`info["user_id"]`). Without replicas it behaves like a plain Session.
+    """
+
+    def __init__(self, *args, replicas: ReplicaSet | None = None, recent_writers: RecentWriters | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self.recent_writers = recent_writers
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if isinstance(clause, UpdateBase):
+            self.info["wrote"] = True
+        if self.replicas is None or self._flushing or not self._reads_from_replica():
+            return super().get_bind(mapper, clause=clause, **kwargs)
+
+        replica = self.info.get("replica")
+        if replica is None:
+            replica = self.info["replica"] = self.replicas.choose()
+        return replica or super().get_bind(mapper, clause=clause, **kwargs)
+
+    def _reads_from_replica(self) -> bool:
+        if not self.info.get("read_only") or self.info.get("wrote"):
+            return False
+        return self.recent_writers is None or self.info.get("user_id") not in self.recent_writers
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _flushed(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _committed(session):
+    if session.info.get("wrote") and session.recent_writers is not None and session.info.get("user_id") is not None:
+        session.recent_writers.note(session.info["user_id"])
@@ -1,5 +1,6 @@
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.client import BaseClient
 from botocore.exceptions import NoCredentialsError, ClientError
 from os import getenv
@@ -12,6 +13,21 @@ S3_REGION = getenv("S3_REGION", "us-east-1")
 S3_BUCKET = getenv("S3_BUCKET")
 S3_ENDPOINT = getenv("S3_ENDPOINT")
 
+# Uploads: how many files go up at once, and when/how a single file is split into multipart chunks
+S3_UPLOAD_CONCURRENCY = int(getenv("S3_UPLOAD_CONCURRENCY", "8"))
+S3_MULTIPART_THRESHOLD_MB = int(getenv("S3_MULTIPART_THRESHOLD_MB", "8"))
+S3_MULTIPART_CHUNK_MB = int(getenv("S3_MULTIPART_CHUNK_MB", "8"))
+S3_PART_CONCURRENCY = int(getenv("S3_PART_CONCURRENCY", "4"))
+
+# Parts are read from the file object one chunk at a time, so a large video
+# never has to sit in memory as a whole
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=S3_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+    multipart_chunksize=S3_MULTIPART_CHUNK_MB * 1024 * 1024,
+    max_concurrency=S3_PART_CONCURRENCY,
+    use_threads=True,
+)
+
 
 class S3ClientManager:
     """
@@ -1,6 +1,6 @@
 
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Generic, List, Optional, TypeVar
 
 from pydantic import BaseModel, EmailStr
 
@@ -44,6 +44,13 @@ class UserProfileSchema(BaseModel):
     you_follow_them: float
 
 
+class UserSearchResult(BaseModel):
+    user_id: int
+    username: str
+    fullname: str
+    followers_count: int
+
+
 
 class MediaURLSchema(BaseModel):
     post_id: str | None
@@ -110,6 +117,17 @@ class PostPublic(BaseModel):
     is_liked: bool | None
     media_urls: Optional[List[MediaURL]]
     author: str
+    like_count: int = 0
+    comment_count: int = 0
+
+
+T = TypeVar("T")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    items: List[T]
+    # pass back as ?cursor= to get the next page, None on the last page
+    next_cursor: Optional[str]
 
 
 class UserPublic(BaseModel):
@@ -1,30 +1,50 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Query, File, UploadFile
+from fastapi import FastAPI, Depends, HTTPException, status, Query, File, UploadFile, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from .lib.database_connection import SessionLocal, engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from .lib.database_connection import SessionLocal, AsyncSessionLocal, engine, async_engine, sync_pool_metrics, async_pool_metrics, replica_engines, replica_pool_metrics, replica_set
 from .lib.schemas import (
     UserSchema, PostSchema, PostCommentSchema, UserPublic, PostPublic, PostCreate, CommentCreate, 
     PostLikeUseful, FollowRequestUseful, UserProfileSchema, ExamCreate, ExamPublic, ExamPublicList,
-    TopicPublic, QuestionPublic, QuestionCreate
+    TopicPublic, QuestionPublic, QuestionCreate, CursorPage, UserSearchResult
 )
 from .lib.models import PostLike, User, Post, PostComment, PostCategory, Friendship, Exam, Topic, Question, ExamSection
-from .src.repository.auth import create_user, authenticate_user, create_access_token, authorize
-from .src.repository.posts import create_post, get_post, update_post, delete_post, like_post_repo, unlike_post_repo, get_likes, get_feed_repo
-from .src.repository.comments import add_comment_repo, get_comments
-from .src.repository.users import get_dashboard, get_user_posts_repo, get_user_profile_repo
+from .src.repository.auth import create_user, authenticate_user, create_access_token, authorize, user_from_token
+from .src.repository.posts import create_post, get_post, get_posts_batch, update_post, delete_post, like_post_repo, unlike_post_repo, get_likes, get_likes_cursor, get_feed_repo, get_feed_cursor_repo
+from .src.repository.comments import add_comment_repo, get_comments, get_comments_cursor
+from .src.repository.users import get_dashboard, get_user_posts_repo, get_user_posts_cursor_repo, get_user_profile_repo
 from .src.repository.frienship import send_follow_request, request_approve_repo, get_follow_requests
-from .src.repository.exams import get_all_exams_paginated, create_exam_repo, get_exam_full_repo
+from .src.repository.exams import get_all_exams_paginated, get_all_exams_cursor, create_exam_repo, get_exam_full_repo, get_compiled_exam, compile_exam, compiled_exams, CompiledExam
+from .src.repository.exports import export_questions, export_exams
 from .src.repository.media import upload_media_to_s3, upload_media_bulk_to_s3
-from .src.repository.question_bank import get_topics_with_stats, sample_questions_from_topic, add_unique_questions_to_topic, delete_questions_from_topic, get_grouped_topics, get_all_groups
+from .src.repository.question_bank import get_topics_with_stats, sample_questions_from_topic, add_unique_questions_to_topic, delete_questions_from_topic, get_grouped_topics, get_all_groups, question_bank_cache, import_questions_ndjson, find_cross_topic_duplicates
+from .lib.cache import cached_json_response, etag_matches, accepts_gzip
+from .src.repository.counters import counter_buffer
+from .src.repository.loader import loader_stats
+from .src.repository.search import search_posts, search_questions
+from .src.repository.user_search import search_users, user_search_index, USER_SEARCH_INDEX, USER_SEARCH_TOP_K
 from typing import List, Optional, Annotated, Dict
+from contextlib import asynccontextmanager
 from uuid import uuid4
 from os import getenv
 from fastapi import Header
 
 from sqlmodel import SQLModel
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # counters are written behind, flush them in the background and once more on the way out
+    counter_buffer.start(SessionLocal)
+    # autocomplete answers from the database until the trie is built
+    if USER_SEARCH_INDEX:
+        user_search_index.start(lambda: SessionLocal(info={"read_only": True}))
+    yield
+    counter_buffer.stop(SessionLocal)
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -40,18 +60,37 @@ app.add_middleware(
 SQLModel.metadata.create_all(engine)
 
 # Dependency to get the database session
-def get_db():
-    db = SessionLocal()
+# GET and HEAD requests read from the replicas (when configured), see lib/replicas.py
+def get_db(request: Request):
+    yield from _request_session(request, read_only=request.method in ("GET", "HEAD"))
+
+# For reads that must see the latest writes, such as refilling a cache an admin write just invalidated
+def get_primary_db(request: Request):
+    yield from _request_session(request, read_only=False)
+
+def _request_session(request: Request, read_only: bool):
+    db = SessionLocal(info={"read_only": read_only})
     try:
         yield db
     finally:
+        loader = db.info.get("loader")
+        if loader is not None:
+            loader.report(f"{request.method} {request.url.path}")
         db.close()
 
+# Handlers backed by the sync Session are plain `def`, FastAPI runs them in its threadpool so a
+# query never blocks the event loop. Repositories ported to AsyncSession get `async def` handlers.
+
+# Dependency to get an async database session, for repositories ported to the async engine
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # OAuth2 password bearer for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_db)) -> UserPublic | None:
+def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_db)) -> UserPublic | None:
 
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -59,10 +98,15 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Se
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    user = authorize(token, db, credentials_exception)
+    # the token carries the user claims, the DB is only hit for tokens issued before that
+    user = user_from_token(token, credentials_exception)
+    if user is None:
+        user = authorize(token, db, credentials_exception)
 
     if user is None:
         raise credentials_exception
+    # lets the session keep this user's reads on the primary right after their own writes
+    db.info["user_id"] = user.user_id
     #print("\n \t ...returning ... \n")
     return user
 
@@ -70,25 +114,25 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Se
 
 # Endpoint for user registration
 @app.post("/register", response_model=UserPublic, status_code=status.HTTP_201_CREATED)
-async def register(user: UserSchema, db: Session = Depends(get_db)):
+def register(user: UserSchema, db: Session = Depends(get_db)):
     return create_user(db=db, user=user)
 
 
 
 # Endpoint for user login and token generation
 @app.post("/login", status_code=status.HTTP_200_OK)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     user = authenticate_user(db=db, username=form_data.username, password=form_data.password)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     
-    access_token = create_access_token(data={"username": user.username})
+    access_token = create_access_token(data=user.model_dump())
     return {"access_token": access_token, "token_type": "bearer", "user": user}
 
 
 # Endpoint to upload a single media file
 @app.post("/media-upload")
-async def upload_media(
+def upload_media(
     current_user: UserPublic = Depends(get_current_user),
     db: Session = Depends(get_db),
     file: UploadFile = File(...)
@@ -98,7 +142,7 @@ async def upload_media(
 
 # Endpoint to upload multiple media files
 @app.post("/media-upload/bulk")
-async def upload_media_bulk(
+def upload_media_bulk(
     current_user: UserPublic = Depends(get_current_user),
     db: Session = Depends(get_db),
     files: List[UploadFile] = File(...)
@@ -108,7 +152,7 @@ async def upload_media_bulk(
 
 # Endpoint to create a new post
 @app.post("/posts", response_model=PostPublic)
-async def create_new_post(post: PostCreate, current_user: UserPublic = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_new_post(post: PostCreate, current_user: UserPublic = Depends(get_current_user), db: Session = Depends(get_db)):
 
     return create_post(db=db, post=post, author_user_id=int(current_user.user_id), author_username = current_user.username)
 
@@ -132,9 +176,15 @@ def unlike_post(post_id: str, current_user: UserPublic = Depends(get_current_use
 
 # Endpoint to comment on a post
 @app.post("/posts/{post_id}/comment", response_model=PostComment, status_code=status.HTTP_201_CREATED)
-def create_comment(post_id: str, comment_data: CommentCreate, current_user: UserPublic = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_comment(post_id: str, comment_data: CommentCreate, current_user: UserPublic = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+
+    return await add_comment_repo(comment_data.content, post_id, current_user, db)
+
 
-    return add_comment_repo(comment_data.content, post_id, current_user, db)
+# Endpoint to see likes by cursor, declared before the /{page} route so "cursor" isn't read as a page
+@app.get("/posts/{post_id}/likes/cursor", response_model=CursorPage[PostLikeUseful])
+def get_post_likes_cursor(post_id: str, cursor: str | None = None, current_user: UserPublic = Depends(get_current_user), db: Session = Depends(get_db)):
+    return get_likes_cursor(post_id, db, cursor)
 
 
 # Endpoint to see likes, page by page
@@ -143,27 +193,42 @@ def get_post_likes(post_id: str, page: int, current_user: UserPublic = Depends(g
     return get_likes(post_id, db, page)
 
 
+# Endpoint to see comments by cursor
+@app.get("/posts/{post_id}/comments/cursor", response_model=CursorPage[PostComment])
+async def get_post_comments_cursor(post_id: str, cursor: str | None = None, current_user: UserPublic = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    return await get_comments_cursor(post_id, db, cursor)
+
+
 # Endpoint to see comments, page by page
 @app.get("/posts/{post_id}/comments/{page}", response_model=list[PostComment])
-def get_post_comments(post_id: str, page: int, current_user: UserPublic = Depends(get_current_user), db: Session = Depends(get_db)):
-    return get_comments(post_id, db, page)
+async def get_post_comments(post_id: str, page: int, current_user: UserPublic = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    return await get_comments(post_id, db, page)
+
+
+# Post listings below are plain dicts already shaped like PostPublic (see post_dicts), sent with
+# ORJSONResponse so they are not validated a second time against response_model
+
+# Endpoint to get several posts by ID at once, ?ids=a,b,c (or repeated ?ids=)
+@app.get("/posts", response_model=List[PostPublic])
+def read_posts(ids: List[str] = Query(...), current_user: UserPublic = Depends(get_current_user), db: Session = Depends(get_db)):
+    return ORJSONResponse(get_posts_batch(post_ids=[post_id for value in ids for post_id in value.split(",")], current_user=current_user, db=db))
 
 
 # Endpoint to get a post by ID
 @app.get("/posts/{post_id}", response_model=PostPublic)
-async def read_post(post_id: str, current_user: UserPublic = Depends(get_current_user), db: Session = Depends(get_db)):
+def read_post(post_id: str, current_user: UserPublic = Depends(get_current_user), db: Session = Depends(get_db)):
     return get_post(post_id=post_id, current_user=current_user, db=db)
 
 
 # Endpoint to see all the logged in user's posts, along with user data
 @app.get("/dashboard/{page}")
-async def dashboard(page: int, current_user: UserPublic = Depends(get_current_user), db: Session = Depends(get_db)):
-    return get_dashboard(user = current_user, db=db, page = page)
+def dashboard(page: int, current_user: UserPublic = Depends(get_current_user), db: Session = Depends(get_db)):
+    return ORJSONResponse(get_dashboard(user = current_user, db=db, page = page))
 
 
 # Endpoint to update a post
 @app.put("/posts/{post_id}", response_model=PostPublic)
-async def update_existing_post(post_id: str, post: Post, current_user: UserPublic = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_existing_post(post_id: str, post: Post, current_user: UserPublic = Depends(get_current_user), db: Session = Depends(get_db)):
     updated_post = update_post(db=db, post_id=post_id, updated_data=post)
     if updated_post is None:
         raise HTTPException(status_code=404, detail="Post not found")
@@ -172,7 +237,7 @@ async def update_existing_post(post_id: str, post: Post, current_user: UserPubli
 
 # Endpoint to delete a post
 @app.delete("/posts/{post_id}", response_model=dict)
-async def delete_existing_post(post_id: str, db: Session = Depends(get_db)):
+def delete_existing_post(post_id: str, db: Session = Depends(get_db)):
     success = delete_post(db=db, post_id=post_id)
     if not success:
         raise HTTPException(status_code=404, detail="Post not found")
@@ -182,7 +247,7 @@ async def delete_existing_post(post_id: str, db: Session = Depends(get_db)):
 
 # Endpoint to get a user (public)
 @app.get("/users/{username}", response_model=UserProfileSchema)
-async def get_user_profile(
+def get_user_profile(
     username: str,
     current_user: UserPublic = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -192,7 +257,7 @@ async def get_user_profile(
 
 # Endpoint the see all follow requests
 @app.get("/follow-requests", response_model = list[FollowRequestUseful])
-async def get_follow_requests_endpoint(
+def get_follow_requests_endpoint(
     current_user: UserPublic = Depends(get_current_user), 
     db: Session = Depends(get_db)
 ):
@@ -202,7 +267,7 @@ async def get_follow_requests_endpoint(
 
 # Endpoint to follow a user
 @app.post("/users/{username}/follow", status_code=status.HTTP_201_CREATED)
-async def follow_user(
+def follow_user(
     username: str,
     current_user: UserPublic = Depends(get_current_user), 
     db: Session = Depends(get_db)
@@ -213,7 +278,7 @@ async def follow_user(
 
 # Endpoint to approve a request_id
 @app.post("/request-approve/{request_id}", response_model = Friendship, status_code=status.HTTP_201_CREATED)
-async def request_approve(
+def request_approve(
     request_id: int,
     current_user: UserPublic = Depends(get_current_user), 
     db: Session = Depends(get_db)
@@ -222,16 +287,28 @@ async def request_approve(
     return request_approve_repo(request_id, current_user, db)
 
 
+# Endpoint to Get user's posts by cursor
+@app.get("/users/{username}/posts/cursor", response_model=CursorPage[PostPublic])
+def get_user_posts_cursor(
+    username: str,
+    cursor: str | None = None,
+    current_user: UserPublic = Depends(get_current_user), 
+    db: Session = Depends(get_db),
+):
+
+    return ORJSONResponse(get_user_posts_cursor_repo(username = username, current_user = current_user, db = db, cursor = cursor))
+
+
 # Endpoint to Get user's posts
 @app.get("/users/{username}/posts/{page}", response_model=List[PostPublic])
-async def get_user_posts(
+def get_user_posts(
     username: str,
     page: int,
     current_user: UserPublic = Depends(get_current_user), 
     db: Session = Depends(get_db),
 ):
 
-    return get_user_posts_repo(username = username, current_user = current_user, db = db, page = page)
+    return ORJSONResponse(get_user_posts_repo(username = username, current_user = current_user, db = db, page = page))
 
 
 
@@ -239,30 +316,68 @@ async def get_user_posts(
 
 # Endpoint to get all posts of followed users, paginated reverse chronological, friends first
 @app.get("/feed", response_model=List[PostPublic])
-async def get_feed(
+def get_feed(
     page: int | None = Query(None, description="Page number for pagination"),
     category: str | None = Query(None, description="Filter by category"),
     current_user: UserPublic = Depends(get_current_user), 
     db: Session = Depends(get_db)
 ):
 
-    return get_feed_repo(page=page, category=category, current_user=current_user, db=db)
+    return ORJSONResponse(get_feed_repo(page=page, category=category, current_user=current_user, db=db))
+
+
+# Same feed, keyset paged: pass the returned next_cursor back to get the following page
+@app.get("/feed/cursor", response_model=CursorPage[PostPublic])
+def get_feed_cursor(
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    category: str | None = Query(None, description="Filter by category"),
+    current_user: UserPublic = Depends(get_current_user), 
+    db: Session = Depends(get_db)
+):
+
+    return ORJSONResponse(get_feed_cursor_repo(cursor=cursor, category=category, current_user=current_user, db=db))
+
+
+# Type-ahead over usernames and full names, by prefix, most followed first
+@app.get("/search/users", response_model=List[UserSearchResult])
+def search_users_endpoint(
+    q: str = Query(..., min_length=1, max_length=100, description="Start of a username, full name or name word"),
+    limit: int = Query(USER_SEARCH_TOP_K, ge=1, le=USER_SEARCH_TOP_K),
+    current_user: UserPublic = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+
+    return ORJSONResponse(search_users(db, q, limit))
+
+
+# Full text search over post captions, ranked, keyset paged by (rank, post_id)
+@app.get("/search/posts", response_model=CursorPage[PostPublic])
+def search_posts_endpoint(
+    q: str = Query(..., min_length=1, max_length=200, description="Search words, websearch syntax"),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    current_user: UserPublic = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
 
+    return ORJSONResponse(search_posts(query=q, current_user=current_user, cursor=cursor, db=db))
 
+
+# Groups and topics are read-mostly, served from question_bank_cache with ETag revalidation.
+# Misses are built from the primary, a lagging replica would refill the cache with stale data.
 @app.get("/api/question_bank/groups", response_model=List[str])
-async def get_groups(db: Session = Depends(get_db)):
-    return get_all_groups(db)
+def get_groups(request: Request, db: Session = Depends(get_primary_db)):
+    return cached_json_response(request, question_bank_cache, ("groups",), lambda: get_all_groups(db))
 
 
 @app.get("/api/question_bank/topics", response_model=Dict[str, List[str]] | List[TopicPublic])
-async def get_topics(group: Optional[str] = None, db: Session = Depends(get_db)):
+def get_topics(request: Request, group: Optional[str] = None, db: Session = Depends(get_primary_db)):
     if group:
-        return get_grouped_topics(db, group)
-    return get_topics_with_stats(db)
+        return cached_json_response(request, question_bank_cache, ("topics", group), lambda: get_grouped_topics(db, group))
+    return cached_json_response(request, question_bank_cache, ("topics",), lambda: get_topics_with_stats(db))
 
 
 @app.get("/api/question_bank/sample", response_model=List[QuestionPublic])
-async def get_sample_questions(
+def get_sample_questions(
     topic: str, 
     count: int = 10, 
     difficulty_proportions: Optional[str] = Query(None, description="Comma separated difficulty proportions (e.g. 2,1,1 for easy,medium,hard)"),
@@ -287,7 +402,7 @@ async def get_sample_questions(
 
 
 @app.post("/api/question_bank/topics/{slug}")
-async def post_questions(slug: str, questions: List[QuestionCreate], db: Session = Depends(get_db), authorization: str = Header(None)):
+def post_questions(slug: str, questions: List[QuestionCreate], db: Session = Depends(get_db), authorization: str = Header(None)):
     admin_secret = getenv("PARIKSHA_ADMIN_SECRET", "super_secret_default")
     if not admin_secret or authorization != f"Bearer {admin_secret}":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin secret")
@@ -297,7 +412,7 @@ async def post_questions(slug: str, questions: List[QuestionCreate], db: Session
 
 
 @app.patch("/api/question_bank/topics/{slug}")
-async def patch_questions(slug: str, questions: List[QuestionCreate], db: Session = Depends(get_db), authorization: str = Header(None)):
+def patch_questions(slug: str, questions: List[QuestionCreate], db: Session = Depends(get_db), authorization: str = Header(None)):
     admin_secret = getenv("PARIKSHA_ADMIN_SECRET", "super_secret_default")
     if not admin_secret or authorization != f"Bearer {admin_secret}":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin secret")
@@ -305,23 +420,87 @@ async def patch_questions(slug: str, questions: List[QuestionCreate], db: Sessio
     return add_unique_questions_to_topic(db, slug, questions)
 
 
+@app.post("/api/question_bank/topics/{slug}/import")
+async def import_questions(slug: str, request: Request, unique: bool = True, db: Session = Depends(get_db), authorization: str = Header(None)):
+    admin_secret = getenv("PARIKSHA_ADMIN_SECRET", "super_secret_default")
+    if not admin_secret or authorization != f"Bearer {admin_secret}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin secret")
+    # NDJSON body (one QuestionCreate per line), read and inserted batch by batch
+    return await import_questions_ndjson(db, slug, request.stream(), unique=unique)
+
+
+@app.get("/api/question_bank/duplicates")
+def get_duplicate_questions(limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db), authorization: str = Header(None)):
+    admin_secret = getenv("PARIKSHA_ADMIN_SECRET", "super_secret_default")
+    if not admin_secret or authorization != f"Bearer {admin_secret}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin secret")
+    return find_cross_topic_duplicates(db, limit)
+
+
+# Full text search over question text and explanations, text matches ranked first
+@app.get("/api/question_bank/search", response_model=CursorPage[QuestionPublic])
+def search_question_bank(
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    authorization: str = Header(None),
+):
+    admin_secret = getenv("PARIKSHA_ADMIN_SECRET", "super_secret_default")
+    if not admin_secret or authorization != f"Bearer {admin_secret}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin secret")
+    return search_questions(query=q, cursor=cursor, db=db)
+
+
+def export_response(chunks, name: str, export_format: str, gzip: bool) -> StreamingResponse:
+    filename = f"{name}.{export_format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else ("text/csv" if export_format == "csv" else "application/x-ndjson")
+    return StreamingResponse(chunks, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+@app.get("/api/question_bank/export")
+def export_question_bank(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    topic: Optional[str] = None,
+    group: Optional[str] = None,
+    gzip: bool = False,
+    authorization: str = Header(None),
+):
+    admin_secret = getenv("PARIKSHA_ADMIN_SECRET", "super_secret_default")
+    if not admin_secret or authorization != f"Bearer {admin_secret}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin secret")
+    return export_response(export_questions(export_format, topic, group, gzip), "questions", export_format, gzip)
+
+
 @app.delete("/api/question_bank/topics/{slug}")
-async def delete_questions(slug: str, db: Session = Depends(get_db), authorization: str = Header(None)):
+def delete_questions(slug: str, db: Session = Depends(get_db), authorization: str = Header(None)):
     admin_secret = getenv("PARIKSHA_ADMIN_SECRET", "super_secret_default")
     if not admin_secret or authorization != f"Bearer {admin_secret}":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin secret")
     return delete_questions_from_topic(db, slug)
 
 
+# Serve a compiled exam as is, gzipped when the client takes it, or a 304 on a matching ETag
+def compiled_exam_response(request: Request, compiled: CompiledExam, status_code: int = status.HTTP_200_OK) -> Response:
+    headers = {"ETag": compiled.etag, "Vary": "Accept-Encoding"}
+    if status_code == status.HTTP_200_OK and etag_matches(request, compiled.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if compiled.gzip_body is not None and accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=compiled.gzip_body, status_code=status_code, media_type="application/json", headers=headers)
+    return Response(content=compiled.body, status_code=status_code, media_type="application/json", headers=headers)
+
+
 @app.post("/pariksha", response_model=ExamPublic, status_code=status.HTTP_201_CREATED)
-async def create_exam(exam_data: ExamCreate, db: Session = Depends(get_db)):
+def create_exam(request: Request, exam_data: ExamCreate, db: Session = Depends(get_db)):
     exam = create_exam_repo(db=db, exam_data=exam_data)
-    # Re-fetch full to return the correct response_model structure
-    return get_exam_full_repo(db=db, exam_id=exam.exam_id)
+    # Re-fetch full to return the correct response_model structure, and warm the cache with it
+    compiled = compile_exam(get_exam_full_repo(db=db, exam_id=exam.exam_id))
+    compiled_exams.set(exam.exam_id, compiled)
+    return compiled_exam_response(request, compiled, status_code=status.HTTP_201_CREATED)
 
 
 @app.get("/pariksha", response_model=List[ExamPublicList])
-async def get_all_exams(page: int = 1, db: Session = Depends(get_db)):
+def get_all_exams(page: int = 1, db: Session = Depends(get_db)):
     exams_from_db = get_all_exams_paginated(db=db, page=page)
     return [
         ExamPublicList(
@@ -332,10 +511,65 @@ async def get_all_exams(page: int = 1, db: Session = Depends(get_db)):
     ]
 
 
+# Declared before /pariksha/{exam_id} so "cursor" isn't read as an exam id
+@app.get("/pariksha/cursor", response_model=CursorPage[ExamPublicList])
+def get_all_exams_by_cursor(cursor: str | None = None, db: Session = Depends(get_db)):
+    exams_page = get_all_exams_cursor(db=db, cursor=cursor)
+    return {
+        "items": [
+            ExamPublicList(
+                exam_id=exam.exam_id,
+                exam_title=exam.exam_title,
+                datetime_uploaded=exam.datetime_uploaded
+            ) for exam in exams_page["items"]
+        ],
+        "next_cursor": exams_page["next_cursor"],
+    }
+
+
+# Declared before /pariksha/{exam_id} as well
+@app.get("/pariksha/export")
+def export_all_exams(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    topic: Optional[str] = None,
+    group: Optional[str] = None,
+    gzip: bool = False,
+    authorization: str = Header(None),
+):
+    admin_secret = getenv("PARIKSHA_ADMIN_SECRET", "super_secret_default")
+    if not admin_secret or authorization != f"Bearer {admin_secret}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin secret")
+    return export_response(export_exams(export_format, topic, group, gzip), "exams", export_format, gzip)
+
+
+# Misses are compiled from the primary: compiled_exams has no TTL, so an exam rebuilt from
+# a lagging replica right after invalidate_compiled_exams would stay stale until evicted
 @app.get("/pariksha/{exam_id}", response_model=ExamPublic)
-async def get_exam_by_id(exam_id: str, db: Session = Depends(get_db)):
-    exam = get_exam_full_repo(db=db, exam_id=exam_id)
-    if not exam:
+def get_exam_by_id(request: Request, exam_id: str, db: Session = Depends(get_primary_db)):
+    compiled = get_compiled_exam(db=db, exam_id=exam_id)
+    if not compiled:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Exam not found")
-    return exam
+    return compiled_exam_response(request, compiled)
+
 
+
+# Connection pool state and checkout wait histogram of both engines, for scraping
+@app.get("/metrics/db")
+def get_db_metrics(authorization: str = Header(None)):
+    admin_secret = getenv("PARIKSHA_ADMIN_SECRET", "super_secret_default")
+    if not admin_secret or authorization != f"Bearer {admin_secret}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin secret")
+    return {
+        "pools": [
+            sync_pool_metrics.snapshot(engine.pool),
+            async_pool_metrics.snapshot(async_engine.pool),
+            *(metrics.snapshot(replica.pool) for replica, metrics in zip(replica_engines, replica_pool_metrics)),
+        ],
+        "replicas": replica_set.status() if replica_set else [],
+        # User/Post lookups answered by the request loaders vs the queries they ran
+        "loader": {
+            "lookups": loader_stats["lookups"],
+            "queries": loader_stats["queries"],
+            "saved": loader_stats["lookups"] - loader_stats["queries"],
+        },
+    }
@@ -4,8 +4,13 @@ from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from ...lib.models import User
 from ...lib.schemas import UserSchema, UserPublic
+from ...lib.exceptions import PasswordWorkersBusy
+from .loader import get_loader
+from .user_search import user_search_index
 from typing import Optional, Annotated
-from os import getenv
+from os import getenv, cpu_count
+from concurrent.futures import ThreadPoolExecutor
+import threading
 
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
@@ -15,21 +20,80 @@ SECRET_KEY = getenv('OUTSTAGRAM_SECRET_KEY', '')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# When on, tokens carry the UserPublic claims and requests are authorized without a DB lookup
+STATELESS_AUTH = getenv("OUTSTAGRAM_STATELESS_AUTH", "true").lower() in ("1", "true", "yes")
+
+# Argon2 cost parameters, defaults are argon2-cffi's own
+ARGON2_TIME_COST = int(getenv("OUTSTAGRAM_ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(getenv("OUTSTAGRAM_ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(getenv("OUTSTAGRAM_ARGON2_PARALLELISM", "4"))
+
+# Password work runs on its own small pool so a login burst can only ever take
+# PASSWORD_WORKERS cores, and at most PASSWORD_QUEUE_DEPTH more logins wait for one.
+# Anything past that is refused with a 503 instead of stalling every other request.
+# Defaults to half the cores, the other half stays free for everything else.
+PASSWORD_WORKERS = int(getenv("OUTSTAGRAM_PASSWORD_WORKERS", str(max(1, (cpu_count() or 2) // 2))))
+PASSWORD_QUEUE_DEPTH = int(getenv("OUTSTAGRAM_PASSWORD_QUEUE_DEPTH", "16"))
+
 # Initialize Argon2 hasher
-ph = PasswordHasher()
+ph = PasswordHasher(
+    time_cost=ARGON2_TIME_COST,
+    memory_cost=ARGON2_MEMORY_COST,
+    parallelism=ARGON2_PARALLELISM,
+)
+
+# argon2-cffi releases the GIL while hashing, so threads are enough here
+_password_pool = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="argon2")
+_password_slots = threading.BoundedSemaphore(PASSWORD_WORKERS + PASSWORD_QUEUE_DEPTH)
+
+
+def _run_password_job(fn, *args):
+    if not _password_slots.acquire(blocking=False):
+        raise PasswordWorkersBusy
+    try:
+        return _password_pool.submit(fn, *args).result()
+    finally:
+        _password_slots.release()
+
+
+def _verify(hashed_password: str, plain_password: str) -> bool:
+    try:
+        return ph.verify(hashed_password, plain_password)
+    except VerifyMismatchError:
+        return False
 
 # Function to hash a password
 def get_password_hash(password: str) -> str:
-    return ph.hash(password)
+    return _run_password_job(ph.hash, password)
 
 # Function to verify a password
 def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _run_password_job(_verify, hashed_password, plain_password)
+
+
+
+# Build the user straight from a verified token, no DB round trip.
+# Returns None for legacy tokens without the user claims, the caller falls back to authorize.
+# There is no revocation: the claims are what they were at login, and a token stays valid
+# until it expires (ACCESS_TOKEN_EXPIRE_MINUTES) even if the user changes in the meantime.
+def user_from_token(token: str, credentials_exception) -> UserPublic | None:
+    if not STATELESS_AUTH:
+        return None
+
     try:
-        ph.verify(hashed_password, plain_password)
-        return True
-    except VerifyMismatchError:
-        return False
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise credentials_exception
 
+    if payload.get("user_id") is None or payload.get("username") is None:
+        return None
+
+    return UserPublic(
+        user_id=payload["user_id"],
+        fullname=payload.get("fullname", ""),
+        username=payload["username"],
+        bio=payload.get("bio"),
+    )
 
 
 def authorize(token: str, db: Session, credentials_exception) -> UserPublic:
@@ -44,7 +108,7 @@ def authorize(token: str, db: Session, credentials_exception) -> UserPublic:
         print(JWTError)
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == username).first()
+    user = get_loader(db).user_by_username(username)
     if user is None:
         raise credentials_exception
 
@@ -79,6 +143,7 @@ def create_user(db: Session, user: UserSchema) -> UserPublic:
     db.add(new_user)
     db.commit()
     db.refresh(new_user)  # Refresh the instance to get the latest data
+    user_search_index.add(new_user.user_id, new_user.username, new_user.fullname)
     
     return UserPublic(
         user_id=new_user.user_id,
@@ -100,7 +165,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 # Function to authenticate a user
 def authenticate_user(db: Session, username: str, password: str) -> Optional[UserPublic]:
-    user = db.query(User).filter(User.username == username).first()
+    user = get_loader(db).user_by_username(username)
     if not user or not verify_password(password, user.password):
         return None  # Return None if authentication fails
     return UserPublic(
@@ -1,25 +1,31 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from ...lib.schemas import UserPublic
-from ...lib.models import PostComment
+from ...lib.models import PostComment, Post
 from ...lib.exceptions import ProblemCommenting, CouldntGetComments, InvalidPageLength
 from ...lib.constants import COMMENT_PAGE_LENGTH
+from ...lib.pagination import encode_cursor, decode_cursor
+from .counters import counter_buffer
 
-def add_comment_repo(content: str, post_id: str, current_user: UserPublic, db: Session):
+# Comments run on the async engine, the handlers await them on the event loop
+
+async def add_comment_repo(content: str, post_id: str, current_user: UserPublic, db: AsyncSession):
     # add the comment and be good
     
     try:
         newcomment = PostComment(post_id = post_id, content = content, author_user_id = current_user.user_id)
         db.add(newcomment)
-        db.commit()
-        db.refresh(newcomment)  # Refresh the instance to get the latest data from the database
+        await db.commit()
+        await db.refresh(newcomment)  # Refresh the instance to get the latest data from the database
+        counter_buffer.add(Post, post_id, "comment_count", 1)
         return newcomment
-    except e:
+    except Exception as e:
         print(e)
+        await db.rollback()
         raise ProblemCommenting
 
 
-def get_comments(post_id: str, db: Session, page: int):
+async def get_comments(post_id: str, db: AsyncSession, page: int):
     if page < 1:
         raise InvalidPageLength
 
@@ -27,9 +33,29 @@ def get_comments(post_id: str, db: Session, page: int):
         offset = (page - 1) * COMMENT_PAGE_LENGTH
 
         statement = select(PostComment).filter_by(post_id=post_id).limit(COMMENT_PAGE_LENGTH).offset(offset)
-        res = db.scalars(statement).all()
+        res = (await db.scalars(statement)).all()
         print("\n\n\n\nres: ", res)
         return res
     
     except:
         raise CouldntGetComments
+
+
+# Keyset paged comments, oldest first, on comment_id
+async def get_comments_cursor(post_id: str, db: AsyncSession, cursor: str | None = None) -> dict:
+
+    after = decode_cursor(cursor, (int,)) if cursor else None
+
+    statement = select(PostComment).filter_by(post_id=post_id)
+    if after is not None:
+        statement = statement.where(PostComment.comment_id > after[0])
+    statement = statement.order_by(PostComment.comment_id).limit(COMMENT_PAGE_LENGTH + 1)
+
+    res = list((await db.scalars(statement)).all())
+    has_more = len(res) > COMMENT_PAGE_LENGTH
+    res = res[:COMMENT_PAGE_LENGTH]
+
+    return {
+        "items": res,
+        "next_cursor": encode_cursor(res[-1].comment_id) if has_more else None,
+    }
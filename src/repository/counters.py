@@ -0,0 +1,196 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import update, bindparam, select, func, or_, Table, ScalarSelect
+from ...lib.models import Post, User, PostLike, PostComment, FollowRequest, FollowRequestStatus
+from collections import defaultdict, deque
+from os import getenv
+from typing import Callable, Deque, Dict, List, Tuple
+import threading
+import time
+
+COUNTER_FLUSH_SECONDS = float(getenv("OUTSTAGRAM_COUNTER_FLUSH_SECONDS", "2"))
+COUNTER_RECONCILE_SECONDS = float(getenv("OUTSTAGRAM_COUNTER_RECONCILE_SECONDS", "3600"))
+# Drifted rows are read again this many flush intervals later, see reconcile_counters
+COUNTER_RECONCILE_SETTLE_FLUSHES = 5
+COUNTER_RECONCILE_LOCK_KEY = 0x6F75_7473  # pg advisory lock key, any int8 not used elsewhere
+
+
+class CounterBuffer:
+    """
+    Write-behind buffer for the denormalized counters on Post and User.
+    Deltas are summed in memory and applied in one batched UPDATE per counter column,
+    so a burst of likes on a hot post becomes a single `like_count = like_count + n`.
+    add() never takes a lock, so the async write paths can call it on the event loop.
+    """
+
+    def __init__(self, flush_interval: float = COUNTER_FLUSH_SECONDS, reconcile_interval: float = COUNTER_RECONCILE_SECONDS):
+        self.flush_interval = flush_interval
+        self.reconcile_interval = reconcile_interval
+        # (model, pk, column, delta), appended by writers and drained by flush
+        self._deltas: Deque[Tuple[type, object, str, int]] = deque()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add(self, model: type, pk, column: str, delta: int = 1) -> None:
+        # deque.append is atomic, no lock needed
+        self._deltas.append((model, pk, column, delta))
+
+    def flush(self, db: Session) -> int:
+        # (model, column) -> primary key -> summed delta
+        pending: Dict[Tuple[type, str], Dict] = defaultdict(lambda: defaultdict(int))
+        for _ in range(len(self._deltas)):
+            model, pk, column, delta = self._deltas.popleft()
+            pending[(model, column)][pk] += delta
+        try:
+            return self._apply(db, pending)
+        except Exception:
+            # put the deltas back, they will go out with the next flush
+            for (model, column), deltas in pending.items():
+                for pk, delta in deltas.items():
+                    self._deltas.append((model, pk, column, delta))
+            raise
+
+    def _apply(self, db: Session, pending: Dict[Tuple[type, str], Dict]) -> int:
+        applied = 0
+        try:
+            for (model, column), deltas in pending.items():
+                rows = [{"b_pk": pk, "b_delta": delta} for pk, delta in deltas.items() if delta]
+                if not rows:
+                    continue
+                table = model.__table__
+                pk_column = list(table.primary_key.columns)[0]
+                db.execute(
+                    update(table)
+                    .where(pk_column == bindparam("b_pk"))
+                    .values({column: table.c[column] + bindparam("b_delta")}),
+                    rows,
+                )
+                applied += len(rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return applied
+
+    def start(self, session_factory: Callable[[], Session]) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(session_factory,), name="counter-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, session_factory: Callable[[], Session]) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._flush_with(session_factory)
+
+    def _flush_with(self, session_factory: Callable[[], Session]) -> None:
+        db = session_factory()
+        try:
+            self.flush(db)
+        except Exception as e:
+            print(f"Couldn't flush counters: {e}")
+        finally:
+            db.close()
+
+    def _run(self, session_factory: Callable[[], Session]) -> None:
+        # Every worker wakes up on the same wall clock slots, the advisory lock in
+        # reconcile_counters lets one of them do the recount for the whole deployment
+        slot = int(time.time() // self.reconcile_interval)
+        while not self._stop.wait(self.flush_interval):
+            self._flush_with(session_factory)
+            if int(time.time() // self.reconcile_interval) != slot:
+                slot = int(time.time() // self.reconcile_interval)
+                db = session_factory()
+                try:
+                    reconcile_counters(db, settle_seconds=COUNTER_RECONCILE_SETTLE_FLUSHES * self.flush_interval)
+                except Exception as e:
+                    print(f"Couldn't reconcile counters: {e}")
+                finally:
+                    db.close()
+
+
+counter_buffer = CounterBuffer()
+
+
+def _counter_sources() -> List[Tuple[Table, Dict[str, ScalarSelect]]]:
+    # counter table -> counter column -> the count it caches, correlated to the counter row
+    return [
+        (Post.__table__, {
+            "like_count": select(func.count()).where(PostLike.post_id == Post.post_id).scalar_subquery(),
+            "comment_count": select(func.count()).where(PostComment.post_id == Post.post_id).scalar_subquery(),
+        }),
+        (User.__table__, {
+            "posts_count": select(func.count()).where(Post.author_user_id == User.user_id).scalar_subquery(),
+            "followers_count": select(func.count()).where(
+                FollowRequest.requested_user_id == User.user_id,
+                FollowRequest.status == FollowRequestStatus.accepted,
+            ).scalar_subquery(),
+            "following_count": select(func.count()).where(
+                FollowRequest.requester_user_id == User.user_id,
+                FollowRequest.status == FollowRequestStatus.accepted,
+            ).scalar_subquery(),
+        }),
+    ]
+
+
+def _drifted(db: Session, table: Table, counts: Dict[str, ScalarSelect], pks: List | None = None) -> Dict:
+    # pk -> (stored counters..., recounted counters...) of the rows where they differ
+    pk_column = list(table.primary_key.columns)[0]
+    statement = select(pk_column, *(table.c[name] for name in counts), *counts.values()).where(
+        or_(*(table.c[name] != count for name, count in counts.items()))
+    )
+    if pks is not None:
+        statement = statement.where(pk_column.in_(pks))
+    return {row[0]: tuple(row[1:]) for row in db.execute(statement)}
+
+
+# Recompute the counters from the source tables, repairing drift (crashed workers losing
+# their buffer, manual SQL, ...). A write commits its source row before its delta reaches
+# a buffer, and other workers' buffers are out of sight, so a recount can't tell drift from
+# a delta still in flight. Drifted rows are read twice, `settle_seconds` apart (several
+# flush intervals); any in-flight delta gets flushed in between and changes the row.
+# Only rows identical in both reads are repaired, each with a compare-and-set UPDATE
+# that skips rows a flush touched since. Returns the number of rows repaired.
+def reconcile_counters(db: Session, settle_seconds: float = 0) -> int:
+    if db.get_bind().dialect.name == "postgresql":
+        # one reconcile per deployment at a time, released when the transaction ends
+        if not db.execute(select(func.pg_try_advisory_xact_lock(COUNTER_RECONCILE_LOCK_KEY))).scalar():
+            db.rollback()
+            return 0
+
+    sources = _counter_sources()
+    first = [_drifted(db, table, counts) for table, counts in sources]
+    if settle_seconds and any(first):
+        time.sleep(settle_seconds)
+
+    repaired = 0
+    for (table, counts), drifted in zip(sources, first):
+        if not drifted:
+            continue
+        again = _drifted(db, table, counts, list(drifted)) if settle_seconds else drifted
+        names = list(counts)
+        rows = [
+            {
+                "b_pk": pk,
+                **{f"b_old_{name}": value for name, value in zip(names, values[:len(names)])},
+                **{f"b_new_{name}": value for name, value in zip(names, values[len(names):])},
+            }
+            for pk, values in again.items()
+            if drifted[pk] == values
+        ]
+        if not rows:
+            continue
+        pk_column = list(table.primary_key.columns)[0]
+        db.execute(
+            update(table)
+            .where(pk_column == bindparam("b_pk"), *(table.c[name] == bindparam(f"b_old_{name}") for name in names))
+            .values({name: bindparam(f"b_new_{name}") for name in names}),
+            rows,
+        )
+        repaired += len(rows)
+
+    db.commit()
+    return repaired
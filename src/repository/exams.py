@@ -1,8 +1,20 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload, joinedload
 from ...lib.models import Exam, ExamSection, SectionQuestionLink, Question
 from ...lib.schemas import ExamCreate, ExamPublic, ExamSectionPublic, QuestionPublic, Marking
+from ...lib.pagination import encode_cursor, decode_cursor
+from ...lib.cache import LRUCache
+from sqlalchemy import tuple_
+from datetime import datetime
+from os import getenv
+from threading import Lock
 from uuid import uuid4
-from typing import List
+from typing import List, NamedTuple
+import gzip
+import hashlib
+
+# Byte budget of the compiled exam cache, shared by plain and gzipped bodies
+EXAM_CACHE_BYTES = int(float(getenv("OUTSTAGRAM_EXAM_CACHE_MB", "64")) * 1024 * 1024)
+EXAM_GZIP_MIN_BYTES = 1024
 
 
 def get_all_exams_paginated(db: Session, page: int = 1, page_size: int = 10):
@@ -14,6 +26,28 @@ def get_all_exams_paginated(db: Session, page: int = 1, page_size: int = 10):
     ).order_by(Exam.datetime_uploaded.desc()).offset(offset).limit(page_size).all()
 
 
+# Keyset paged exam listing, newest first, on (datetime_uploaded, exam_id)
+def get_all_exams_cursor(db: Session, cursor: str | None = None, page_size: int = 10) -> dict:
+    after = decode_cursor(cursor, (datetime, str)) if cursor else None
+
+    query = db.query(
+        Exam.exam_id,
+        Exam.exam_title,
+        Exam.datetime_uploaded
+    )
+    if after is not None:
+        query = query.filter(tuple_(Exam.datetime_uploaded, Exam.exam_id) < tuple_(*after))
+    exams = query.order_by(Exam.datetime_uploaded.desc(), Exam.exam_id.desc()).limit(page_size + 1).all()
+
+    has_more = len(exams) > page_size
+    exams = exams[:page_size]
+
+    return {
+        "items": exams,
+        "next_cursor": encode_cursor(exams[-1].datetime_uploaded, exams[-1].exam_id) if has_more else None,
+    }
+
+
 def create_exam_repo(db: Session, exam_data: ExamCreate) -> Exam:
     exam_id = str(uuid4())
     new_exam = Exam(
@@ -44,8 +78,19 @@ def create_exam_repo(db: Session, exam_data: ExamCreate) -> Exam:
     return new_exam
 
 
+# Loads the whole exam in three queries whatever its size: the exam, its sections,
+# and the questions of all sections (through the link table) with their topics joined in
 def get_exam_full_repo(db: Session, exam_id: str) -> ExamPublic | None:
-    exam = db.query(Exam).filter(Exam.exam_id == exam_id).first()
+    exam = (
+        db.query(Exam)
+        .options(
+            selectinload(Exam.sections)
+            .selectinload(ExamSection.questions)
+            .joinedload(Question.topic)
+        )
+        .filter(Exam.exam_id == exam_id)
+        .first()
+    )
     if not exam:
         return None
 
@@ -57,6 +102,7 @@ def get_exam_full_repo(db: Session, exam_id: str) -> ExamPublic | None:
                 QuestionPublic(
                     id=q.id,
                     type=q.type,
+                    difficulty=q.difficulty,
                     question=q.question,
                     options=q.options,
                     answer_label=q.answer_label,
@@ -85,3 +131,66 @@ def get_exam_full_repo(db: Session, exam_id: str) -> ExamPublic | None:
         sections=sections_public
     )
 
+
+
+class CompiledExam(NamedTuple):
+    body: bytes
+    gzip_body: bytes | None
+    etag: str
+
+
+# Serialized exam responses, kept until evicted or invalidated. Exams are not edited, but
+# deleting a topic's questions drops them from the exams using them, and
+# delete_questions_from_topic invalidates those exams. Per process, like the other caches.
+compiled_exams = LRUCache(
+    maxsize=EXAM_CACHE_BYTES,
+    weigh=lambda compiled: len(compiled.body) + len(compiled.gzip_body or b""),
+)
+# exam_id -> [lock, number of callers holding or waiting on it]
+_compile_locks: dict = {}
+_compile_locks_guard = Lock()
+# bumped by every invalidation, a build that straddles one is not cached
+_compile_generation = 0
+
+
+def invalidate_compiled_exams(exam_ids: List[str]) -> None:
+    global _compile_generation
+    with _compile_locks_guard:
+        _compile_generation += 1
+    for exam_id in exam_ids:
+        compiled_exams.pop(exam_id)
+
+
+def compile_exam(exam: ExamPublic) -> CompiledExam:
+    body = exam.model_dump_json().encode()
+    gzip_body = gzip.compress(body, compresslevel=6) if len(body) >= EXAM_GZIP_MIN_BYTES else None
+    return CompiledExam(body=body, gzip_body=gzip_body, etag=f'"{hashlib.sha1(body).hexdigest()}"')
+
+
+def get_compiled_exam(db: Session, exam_id: str) -> CompiledExam | None:
+    compiled = compiled_exams.get(exam_id)
+    if compiled is not None:
+        return compiled
+
+    # One build per exam: concurrent misses for the same exam wait for the first one
+    with _compile_locks_guard:
+        entry = _compile_locks.setdefault(exam_id, [Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            compiled = compiled_exams.get(exam_id)
+            if compiled is None:
+                generation = _compile_generation
+                exam = get_exam_full_repo(db, exam_id)
+                if exam is not None:
+                    compiled = compile_exam(exam)
+                    with _compile_locks_guard:
+                        if generation == _compile_generation:
+                            compiled_exams.set(exam_id, compiled)
+    finally:
+        # the last caller out removes the lock, a new caller then starts from a fresh one
+        with _compile_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _compile_locks[exam_id]
+    return compiled
@@ -0,0 +1,188 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ...lib.models import Question, Topic, TopicGroup, TopicGroupLink, Exam, ExamSection, SectionQuestionLink
+from ...lib.database_connection import SessionLocal
+from typing import Callable, Iterator, List
+from datetime import datetime
+from enum import Enum
+import csv
+import io
+import json
+import zlib
+
+# Rows fetched per round trip from the server side cursor, and written out as one chunk
+EXPORT_BATCH_SIZE = 1000
+
+QUESTION_COLUMNS = [
+    "id", "topic", "type", "difficulty", "question", "options", "answer_label", "answer_labels",
+    "answer_range", "answer_value", "explanation", "image_path", "content_hash",
+]
+EXAM_CSV_COLUMNS = [
+    "exam_id", "exam_title", "datetime_uploaded", "section_id", "section_name",
+    "marking_positive", "marking_negative", "max_attempts", "question_id",
+]
+
+
+def _questions_statement(topic_slug: str | None, group: str | None):
+    statement = (
+        select(
+            Question.id, Topic.slug.label("topic"), Question.type, Question.difficulty, Question.question,
+            Question.options, Question.answer_label, Question.answer_labels, Question.answer_range,
+            Question.answer_value, Question.explanation, Question.image_path, Question.content_hash,
+        )
+        .join(Topic, Topic.topic_id == Question.topic_id)
+    )
+    if topic_slug is not None:
+        statement = statement.where(Topic.slug == topic_slug)
+    if group is not None:
+        statement = statement.where(Question.topic_id.in_(_group_topic_ids(group)))
+    return statement.order_by(Question.topic_id, Question.id)
+
+
+def _group_topic_ids(group: str):
+    return (
+        select(TopicGroupLink.topic_id)
+        .join(TopicGroup, TopicGroup.group_id == TopicGroupLink.group_id)
+        .where(TopicGroup.name == group)
+    )
+
+
+def _exams_statement(topic_slug: str | None, group: str | None):
+    # one row per (exam, section, question), grouped back into exams while streaming
+    statement = (
+        select(
+            Exam.exam_id, Exam.exam_title, Exam.exam_json_str, Exam.datetime_uploaded,
+            ExamSection.id.label("section_id"), ExamSection.name.label("section_name"),
+            ExamSection.marking_positive, ExamSection.marking_negative, ExamSection.max_attempts,
+            SectionQuestionLink.question_id,
+        )
+        .outerjoin(ExamSection, ExamSection.exam_id == Exam.exam_id)
+        .outerjoin(SectionQuestionLink, SectionQuestionLink.section_id == ExamSection.id)
+    )
+    if topic_slug is not None or group is not None:
+        # exams that use at least one question of the topic / group
+        matching = (
+            select(ExamSection.exam_id)
+            .join(SectionQuestionLink, SectionQuestionLink.section_id == ExamSection.id)
+            .join(Question, Question.id == SectionQuestionLink.question_id)
+        )
+        if topic_slug is not None:
+            matching = matching.join(Topic, Topic.topic_id == Question.topic_id).where(Topic.slug == topic_slug)
+        if group is not None:
+            matching = matching.where(Question.topic_id.in_(_group_topic_ids(group)))
+        statement = statement.where(Exam.exam_id.in_(matching))
+    return statement.order_by(Exam.exam_id, ExamSection.id, SectionQuestionLink.question_id)
+
+
+def _stream_rows(db: Session, statement) -> Iterator[List]:
+    # server side cursor, only one batch of rows is held in memory at a time
+    result = db.execute(statement.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE))
+    yield from result.partitions()
+
+
+def _plain(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv_cell(value):
+    value = _plain(value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+def _csv_chunk(rows: List[List]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([[_csv_cell(value) for value in row] for row in rows])
+    return buffer.getvalue().encode()
+
+
+def _ndjson_chunk(documents: List[dict]) -> bytes:
+    return b"".join(json.dumps(document, separators=(",", ":"), default=_plain).encode() + b"\n" for document in documents)
+
+
+def _questions_chunks(db: Session, export_format: str, topic_slug: str | None, group: str | None) -> Iterator[bytes]:
+    if export_format == "csv":
+        yield _csv_chunk([QUESTION_COLUMNS])
+    for rows in _stream_rows(db, _questions_statement(topic_slug, group)):
+        if export_format == "csv":
+            yield _csv_chunk(rows)
+        else:
+            yield _ndjson_chunk([{column: _plain(value) for column, value in zip(QUESTION_COLUMNS, row)} for row in rows])
+
+
+def _exams_chunks(db: Session, export_format: str, topic_slug: str | None, group: str | None) -> Iterator[bytes]:
+    statement = _exams_statement(topic_slug, group)
+    if export_format == "csv":
+        yield _csv_chunk([EXAM_CSV_COLUMNS])
+        for rows in _stream_rows(db, statement):
+            yield _csv_chunk([
+                [row.exam_id, row.exam_title, row.datetime_uploaded, row.section_id, row.section_name,
+                 row.marking_positive, row.marking_negative, row.max_attempts, row.question_id]
+                for row in rows
+            ])
+        return
+
+    # rows come ordered by exam then section, so only the exam being assembled is kept
+    exam = None
+    for rows in _stream_rows(db, statement):
+        finished = []
+        for row in rows:
+            if exam is None or exam["exam_id"] != row.exam_id:
+                if exam is not None:
+                    finished.append(exam)
+                exam = {
+                    "exam_id": row.exam_id,
+                    "exam_title": row.exam_title,
+                    "exam_json_str": row.exam_json_str,
+                    "datetime_uploaded": row.datetime_uploaded,
+                    "sections": [],
+                }
+            if row.section_id is None:
+                continue
+            if not exam["sections"] or exam["sections"][-1]["id"] != row.section_id:
+                exam["sections"].append({
+                    "id": row.section_id,
+                    "name": row.section_name,
+                    "marking": {"positive": row.marking_positive, "negative": row.marking_negative},
+                    "max_attempts": row.max_attempts,
+                    "questions": [],
+                })
+            if row.question_id is not None:
+                exam["sections"][-1]["questions"].append(row.question_id)
+        if finished:
+            yield _ndjson_chunk(finished)
+    if exam is not None:
+        yield _ndjson_chunk([exam])
+
+
+def _gzipped(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _export(chunks: Callable[[Session], Iterator[bytes]], gzip: bool) -> Iterator[bytes]:
+    # The generator runs after the request's dependencies are torn down, so it owns its session.
+    # Exports only read, so they go to a replica when there is one.
+    db = SessionLocal(info={"read_only": True})
+    try:
+        body = chunks(db)
+        yield from _gzipped(body) if gzip else body
+    finally:
+        db.close()
+
+
+def export_questions(export_format: str = "ndjson", topic_slug: str | None = None, group: str | None = None, gzip: bool = False) -> Iterator[bytes]:
+    return _export(lambda db: _questions_chunks(db, export_format, topic_slug, group), gzip)
+
+
+def export_exams(export_format: str = "ndjson", topic_slug: str | None = None, group: str | None = None, gzip: bool = False) -> Iterator[bytes]:
+    return _export(lambda db: _exams_chunks(db, export_format, topic_slug, group), gzip)
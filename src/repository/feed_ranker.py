@@ -0,0 +1,137 @@
+from sqlalchemy.orm import Session
+from sqlmodel import select, desc
+from ...lib.models import Post, TimelineEntry
+from ...lib.constants import FEED_PAGE_LENGTH
+from ...lib.cache import LRUCache
+from .follow_graph import follow_graph
+from datetime import datetime
+from os import getenv
+from typing import List, NamedTuple, Tuple
+import numpy as np
+import time
+
+# Newest timeline entries scored per request; pages past them are served chronologically.
+# Rounded up to whole feed pages, a page straddling the window's end would skip posts.
+FEED_CANDIDATES = -(-int(getenv("OUTSTAGRAM_FEED_CANDIDATES", "500")) // FEED_PAGE_LENGTH) * FEED_PAGE_LENGTH
+# A post's recency score halves every this many hours
+FEED_HALF_LIFE_HOURS = float(getenv("OUTSTAGRAM_FEED_HALF_LIFE_HOURS", "24"))
+# How long pages 2+ keep being served from the ranking made for page 1
+FEED_RANKING_TTL = float(getenv("OUTSTAGRAM_FEED_RANKING_TTL", "600"))
+FEED_RANKING_CACHE_SIZE = int(getenv("OUTSTAGRAM_FEED_RANKING_CACHE_SIZE", "10000"))
+
+
+class FeedWeights(NamedTuple):
+    # recency counts 1 for a brand new post, the others are added on top of it
+    mutual: float = 0.6
+    highlighted: float = 0.3
+    # per e-fold of likes + 2 x comments
+    engagement: float = 0.1
+
+
+class FeedCandidates(NamedTuple):
+    post_ids: List[str]
+    age_hours: np.ndarray
+    author_ids: np.ndarray
+    highlighted: np.ndarray
+    likes: np.ndarray
+    comments: np.ndarray
+    # (datetime_posted, post_id) of the oldest candidate, where the chronological pages carry on
+    oldest: Tuple[datetime, str] | None = None
+
+
+def get_feed_candidates(db: Session, owner_user_id: int, category: str | None = None, limit: int = FEED_CANDIDATES) -> FeedCandidates:
+    # one bounded query: the newest `limit` timeline entries with the post columns the score needs
+    statement = (
+        select(
+            TimelineEntry.post_id, TimelineEntry.datetime_posted, TimelineEntry.author_user_id,
+            Post.highlighted_by_author, Post.like_count, Post.comment_count,
+        )
+        .join(Post, Post.post_id == TimelineEntry.post_id)
+        .where(TimelineEntry.owner_user_id == owner_user_id)
+    )
+    if category is not None:
+        statement = statement.where(Post.post_category == category)
+    rows = db.execute(
+        statement.order_by(desc(TimelineEntry.datetime_posted), desc(TimelineEntry.post_id)).limit(limit)
+    ).all()
+
+    post_ids, posted, author_ids, highlighted, likes, comments = zip(*rows) if rows else ([], [], [], [], [], [])
+    # timestamps are stored as naive UTC (datetime.utcnow)
+    age = np.datetime64(datetime.utcnow(), "us") - np.array(posted, dtype="datetime64[us]")
+    return FeedCandidates(
+        post_ids=list(post_ids),
+        age_hours=age / np.timedelta64(1, "h"),
+        author_ids=np.array(author_ids, dtype=np.int64),
+        highlighted=np.array(highlighted, dtype=bool),
+        likes=np.array(likes, dtype=np.float64),
+        comments=np.array(comments, dtype=np.float64),
+        oldest=(posted[-1], post_ids[-1]) if rows else None,
+    )
+
+
+def score_candidates(
+    candidates: FeedCandidates,
+    mutual_ids: np.ndarray,
+    half_life_hours: float = FEED_HALF_LIFE_HOURS,
+    weights: FeedWeights = FeedWeights(),
+) -> np.ndarray:
+    recency = np.exp2(-np.maximum(candidates.age_hours, 0) / half_life_hours)
+    mutual = np.isin(candidates.author_ids, mutual_ids)
+    engagement = np.log1p(np.maximum(candidates.likes + 2 * candidates.comments, 0))
+    return (
+        recency
+        + weights.mutual * mutual
+        + weights.highlighted * candidates.highlighted
+        + weights.engagement * engagement
+    )
+
+
+def rank_candidates(candidates: FeedCandidates, mutual_ids: np.ndarray, offset: int = 0, limit: int | None = None) -> List[str]:
+    scores = score_candidates(candidates, mutual_ids)
+    end = len(scores) if limit is None else min(offset + limit, len(scores))
+    if offset >= end:
+        return []
+    # only the best `end` candidates are sorted, found in linear time
+    top = np.argpartition(-scores, end - 1)[:end] if end < len(scores) else np.arange(len(scores))
+    # best score first, then candidate order (newest first) among equal scores
+    order = top[np.lexsort((top, -scores[top]))]
+    return [candidates.post_ids[i] for i in order[offset:end].tolist()]
+
+
+def mutual_follow_ids(db: Session, user_id: int) -> np.ndarray:
+    # users who follow the viewer back, from the viewer's cached sorted edge arrays
+    edges = follow_graph.edges(db, user_id)
+    return np.intersect1d(
+        np.frombuffer(edges.following, dtype=np.int64),
+        np.frombuffer(edges.followers, dtype=np.int64),
+        assume_unique=True,
+    )
+
+
+class RankedFeed(NamedTuple):
+    post_ids: List[str]
+    # keyset the chronological pages start after, None when the window held the whole timeline
+    boundary: Tuple[datetime, str] | None
+
+
+# (owner_user_id, category) -> (expires at, RankedFeed). Per process like follow_graph,
+# a page served by another worker is ranked afresh there.
+ranked_feeds = LRUCache(maxsize=FEED_RANKING_CACHE_SIZE)
+
+
+# Scores move between requests (recency, likes, new posts entering the window), so ranking
+# each page on its own would skip some posts and repeat others. Page 1 ranks the whole
+# window and keeps it; the following pages are slices of that same ranking.
+def ranked_feed(db: Session, owner_user_id: int, category: str | None = None, fresh: bool = False) -> RankedFeed:
+    key = (owner_user_id, category)
+    if not fresh:
+        entry = ranked_feeds.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+    candidates = get_feed_candidates(db, owner_user_id, category)
+    post_ids = rank_candidates(candidates, mutual_follow_ids(db, owner_user_id)) if candidates.post_ids else []
+    boundary = candidates.oldest if len(candidates.post_ids) == FEED_CANDIDATES else None
+    ranked = RankedFeed(post_ids, boundary)
+    ranked_feeds.set(key, (time.monotonic() + FEED_RANKING_TTL, ranked))
+    return ranked
@@ -0,0 +1,68 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import or_
+from sqlmodel import select
+from ...lib.models import FollowRequest, FollowRequestStatus
+from ...lib.cache import LRUCache
+from array import array
+from bisect import bisect_left
+from os import getenv
+from typing import NamedTuple
+import time
+
+# Writes made through other workers are picked up after this long
+FOLLOW_GRAPH_TTL = float(getenv("OUTSTAGRAM_FOLLOW_GRAPH_TTL", "60"))
+FOLLOW_GRAPH_CACHE_SIZE = int(getenv("OUTSTAGRAM_FOLLOW_GRAPH_CACHE_SIZE", "10000"))
+
+
+class FollowEdges(NamedTuple):
+    # sorted user ids, 8 bytes each
+    following: array
+    followers: array
+    requested: array  # pending requests sent by the user
+    requested_by: array  # pending requests sent to the user
+
+
+def has_edge(ids: array, user_id: int) -> bool:
+    i = bisect_left(ids, user_id)
+    return i < len(ids) and ids[i] == user_id
+
+
+class FollowGraphCache:
+    """
+    Per-user follow edges, loaded with one query over the user's follow requests
+    and kept as sorted int arrays instead of ORM rows. Entries expire after the TTL,
+    and the follow request writes invalidate both users involved.
+    """
+
+    def __init__(self, ttl: float = FOLLOW_GRAPH_TTL, maxsize: int = FOLLOW_GRAPH_CACHE_SIZE):
+        self.ttl = ttl
+        self._entries = LRUCache(maxsize=maxsize)
+
+    def edges(self, db: Session, user_id: int) -> FollowEdges:
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        following, followers, requested, requested_by = [], [], [], []
+        rows = db.execute(
+            select(FollowRequest.requester_user_id, FollowRequest.requested_user_id, FollowRequest.status)
+            .where(or_(FollowRequest.requester_user_id == user_id, FollowRequest.requested_user_id == user_id))
+        ).all()
+        for requester_id, requested_id, status in rows:
+            outgoing = requester_id == user_id
+            other_id = requested_id if outgoing else requester_id
+            if status == FollowRequestStatus.accepted:
+                (following if outgoing else followers).append(other_id)
+            elif status == FollowRequestStatus.pending:
+                (requested if outgoing else requested_by).append(other_id)
+
+        edges = FollowEdges(*(array("q", sorted(ids)) for ids in (following, followers, requested, requested_by)))
+        self._entries.set(user_id, (time.monotonic() + self.ttl, edges))
+        return edges
+
+    def invalidate(self, *user_ids: int) -> None:
+        for user_id in user_ids:
+            self._entries.pop(user_id)
+
+
+follow_graph = FollowGraphCache()
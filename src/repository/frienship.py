@@ -4,10 +4,15 @@ from ...lib.models import User, FollowRequest, FollowRequestStatus, Friendship
 from fastapi import HTTPException
 from sqlalchemy import select, and_, or_
 from sqlalchemy.exc import SQLAlchemyError
+from .timeline import backfill_timeline
+from .counters import counter_buffer
+from .loader import get_loader
+from .follow_graph import follow_graph
+from .user_search import user_search_index
 
 def send_follow_request(target_username: str, current_user: UserPublic, db: Session):
 
-    target_user = db.query(User).filter(User.username == target_username).first()
+    target_user = get_loader(db).user_by_username(target_username)
     if not target_user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -37,6 +42,7 @@ def send_follow_request(target_username: str, current_user: UserPublic, db: Sess
     
     db.add(follow_request)
     db.commit()
+    follow_graph.invalidate(current_user.user_id, target_user.user_id)
     
     return {"message": "Follow request sent"}
 
@@ -97,7 +103,8 @@ def request_approve_repo(request_id: int, current_user: UserPublic, db: Session)
         )
     ).first()
     
-    if existing_friendship:
+    # the reverse one-way friendship (we already follow the requester) becomes mutual below
+    if existing_friendship and (existing_friendship.being_followed == 0 or existing_friendship.user1_id == follow_request.requester_user_id):
         raise HTTPException(
             status_code=400,
             detail="Friendship already exists"
@@ -108,17 +115,29 @@ def request_approve_repo(request_id: int, current_user: UserPublic, db: Session)
         # Update the follow request status to accepted
         follow_request.status = FollowRequestStatus.accepted
         
-        # Create new friendship record
-        new_friendship = Friendship(
-            user1_id=follow_request.requester_user_id,
-            user2_id=current_user.user_id,
-            being_followed=2
-        )
+        if existing_friendship:
+            # zero marks both-ways, the feed ranker puts mutual friends first
+            existing_friendship.being_followed = 0
+            new_friendship = existing_friendship
+        else:
+            # Create new friendship record
+            new_friendship = Friendship(
+                user1_id=follow_request.requester_user_id,
+                user2_id=current_user.user_id,
+                being_followed=2
+            )
+            db.add(new_friendship)
         
-        # Add and commit both changes
-        db.add(new_friendship)
+        # The new follower's feed starts with the author's recent posts
+        backfill_timeline(db, owner_user_id=follow_request.requester_user_id, author_user_id=current_user.user_id)
+
+        # Commit both changes
         db.commit()
         db.refresh(new_friendship)
+        follow_graph.invalidate(current_user.user_id, follow_request.requester_user_id)
+        counter_buffer.add(User, current_user.user_id, "followers_count", 1)
+        user_search_index.adjust_followers(current_user.user_id, 1)
+        counter_buffer.add(User, follow_request.requester_user_id, "following_count", 1)
 
         #print("\n\n new friendship record is: ", new_friendship)
         
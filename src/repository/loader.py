@@ -0,0 +1,85 @@
+from sqlalchemy.orm import Session
+from sqlmodel import select
+from ...lib.models import User, Post
+from collections import Counter
+from os import getenv
+from threading import Lock
+from typing import Dict, Hashable, Iterable
+
+# Logs each request's lookup savings
+LOADER_DEBUG = getenv("OUTSTAGRAM_LOADER_DEBUG", "false").lower() == "true"
+
+# Process wide totals, served with the pool metrics
+loader_stats = Counter()
+_stats_lock = Lock()
+
+
+class RequestLoader:
+    """
+    Memo of the User and Post rows looked up while serving one request, so that
+    `authorize`, the repository function and its helpers share a single query for
+    the same user or post. Lookups for several keys are batched into one IN query.
+    Lives in the request's Session.info (see get_loader), misses are cached too.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.users_by_id: Dict[int, User | None] = {}
+        self.users_by_username: Dict[str, User | None] = {}
+        self.posts: Dict[str, Post | None] = {}
+        self.lookups = 0
+        self.queries = 0
+
+    def users_by_ids(self, user_ids: Iterable[int]) -> Dict[int, User | None]:
+        return self._load(user_ids, self.users_by_id, User.user_id)
+
+    def users_by_usernames(self, usernames: Iterable[str]) -> Dict[str, User | None]:
+        return self._load(usernames, self.users_by_username, User.username)
+
+    def posts_by_ids(self, post_ids: Iterable[str]) -> Dict[str, Post | None]:
+        return self._load(post_ids, self.posts, Post.post_id)
+
+    def user(self, user_id: int) -> User | None:
+        return self.users_by_ids([user_id])[user_id]
+
+    def user_by_username(self, username: str) -> User | None:
+        return self.users_by_usernames([username])[username]
+
+    def post(self, post_id: str) -> Post | None:
+        return self.posts_by_ids([post_id])[post_id]
+
+    def _load(self, keys: Iterable[Hashable], memo: Dict, column) -> Dict:
+        keys = list(dict.fromkeys(keys))
+        self.lookups += len(keys)
+        missing = [key for key in keys if key not in memo]
+        if missing:
+            self.queries += 1
+            for key in missing:
+                memo[key] = None
+            for row in self.db.scalars(select(column.class_).where(column.in_(missing))).all():
+                self._remember(row)
+        return {key: memo[key] for key in keys}
+
+    def _remember(self, row) -> None:
+        if isinstance(row, User):
+            self.users_by_id[row.user_id] = row
+            self.users_by_username[row.username] = row
+        else:
+            self.posts[row.post_id] = row
+
+    def forget_post(self, post_id: str) -> None:
+        self.posts.pop(post_id, None)
+
+    def report(self, label: str = "") -> None:
+        with _stats_lock:
+            loader_stats["lookups"] += self.lookups
+            loader_stats["queries"] += self.queries
+        if LOADER_DEBUG and self.lookups:
+            print(f"loader {label}: {self.lookups} lookups, {self.queries} queries, {self.lookups - self.queries} saved")
+
+
+def get_loader(db: Session) -> RequestLoader:
+    loader = db.info.get("loader")
+    if loader is None:
+        loader = db.info["loader"] = RequestLoader(db)
+    return loader
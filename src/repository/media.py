@@ -1,7 +1,8 @@
-
 from fastapi import UploadFile, HTTPException
 from sqlalchemy.orm import Session
-from ...lib.s3_client import S3ClientManager
+from ...lib.s3_client import S3ClientManager, S3_TRANSFER_CONFIG, S3_UPLOAD_CONCURRENCY
+from ...lib.presign import presign
+from concurrent.futures import ThreadPoolExecutor
 from uuid import uuid4
 import time
 from typing import List
@@ -10,24 +11,26 @@ s3_manager = S3ClientManager()
 s3_client = s3_manager.get_client()
 s3_bucket = s3_manager.get_bucket()
 
+# boto3 clients are thread safe, one shared pool bounds the files in flight across all requests
+_upload_pool = ThreadPoolExecutor(max_workers=S3_UPLOAD_CONCURRENCY, thread_name_prefix="s3-upload")
+
 def upload_media_to_s3(file: UploadFile, db: Session):
     
     file_extension = file.filename.split('.')[-1]
     object_key = f"{int(time.time())}-{uuid4()}.{file_extension}"
 
     try:
+        # streams from the spooled upload, switching to multipart above the threshold
         s3_client.upload_fileobj(
             file.file,
             s3_bucket,
             object_key,
-            ExtraArgs={'ContentType': file.content_type, 'ACL': 'public-read'}
+            ExtraArgs={'ContentType': file.content_type, 'ACL': 'public-read'},
+            Config=S3_TRANSFER_CONFIG,
         )
 
-        presigned_url = s3_client.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': s3_bucket, 'Key': object_key},
-            ExpiresIn=604800  # 7 days
-        )
+        # posts store object_key, the presigned URL is only for showing a preview
+        presigned_url = presign(object_key)
 
         return {"object_key": object_key, "presigned_url": presigned_url}
     except Exception as e:
@@ -35,8 +38,6 @@ def upload_media_to_s3(file: UploadFile, db: Session):
 
 def upload_media_bulk_to_s3(files: List[UploadFile], db: Session):
     
-    results = []
-    for file in files:
-        results.append(upload_media_to_s3(file, db))
-    
-    return results
+    # all files go up in parallel, results keep the order the files came in
+    futures = [_upload_pool.submit(upload_media_to_s3, file, db) for file in files]
+    return [future.result() for future in futures]
@@ -1,20 +1,25 @@
 
 from sqlalchemy.orm import Session, joinedload, selectinload
 from sqlmodel import select, func, and_, exists, desc
+from sqlalchemy import tuple_, delete
+from sqlalchemy.exc import IntegrityError
 from ...lib.models import Post, User, MediaURL, PostLike, PostCategory, FollowRequest
 from ...lib.schemas import Post, PostPublic, UserPublic, PostCreate
-from ...lib.exceptions import CouldntGetLikes, InvalidPageLength, PostNotFound, InvalidCategory
-from ...lib.constants import LIKE_PAGE_LENGTH, FEED_PAGE_LENGTH
-from ...lib.s3_client import S3ClientManager
+from ...lib.exceptions import CouldntGetLikes, InvalidPageLength, PostNotFound, InvalidCategory, InvalidBatchSize
+from ...lib.constants import LIKE_PAGE_LENGTH, FEED_PAGE_LENGTH, POSTS_BATCH_LIMIT
+from ...lib.presign import presign, object_key_from_url
+from ...lib.pagination import encode_cursor, decode_cursor
+from ...lib.database_connection import dialect_insert
+from .counters import counter_buffer
+from .loader import get_loader
+from .search_index import index_post, unindex_post
+from .timeline import fan_out_post, remove_post_from_timelines, get_timeline_page
+from .feed_ranker import ranked_feed, FEED_CANDIDATES
 from uuid import uuid4
-from datetime import datetime, timedelta, timezone, date
+from datetime import datetime, date
 from typing import List
 from uuid import uuid4
 
-s3_manager = S3ClientManager()
-s3_client = s3_manager.get_client()
-s3_bucket = s3_manager.get_bucket()
-
 def is_valid_category(category_str: str) -> bool:
     try:
         PostCategory(category_str)
@@ -22,6 +27,14 @@ def is_valid_category(category_str: str) -> bool:
     except ValueError:
         return False
 
+
+# Response copies of the media rows with signed URLs, the stored rows keep their object keys
+def sign_media_urls(media_urls: List[MediaURL]) -> List[MediaURL]:
+    return [
+        MediaURL(post_id=media.post_id, url=presign(media.url), media_type=media.media_type)
+        for media in media_urls
+    ]
+
 # Function to create a new post
 def create_post(db: Session, post: PostCreate, author_user_id: int, author_username: str) -> PostPublic:
 
@@ -29,7 +42,8 @@ def create_post(db: Session, post: PostCreate, author_user_id: int, author_usern
 
     media_url_objects = []
     for media_url in post.media_urls:
-        media_url_object = MediaURL(post_id=str(post_id_formulated), url=media_url.url, media_type=media_url.media_type)
+        # clients send back the presigned URL from /media-upload, only its object key is stored
+        media_url_object = MediaURL(post_id=str(post_id_formulated), url=object_key_from_url(media_url.url), media_type=media_url.media_type)
         media_url_objects.append(media_url_object)
         db.add(media_url_object)
 
@@ -41,8 +55,12 @@ def create_post(db: Session, post: PostCreate, author_user_id: int, author_usern
     )
     
     db.add(new_post)
+    db.flush()
+    fan_out_post(db, new_post)
     db.commit()
     db.refresh(new_post)
+    index_post(new_post.post_id, new_post.caption)
+    counter_buffer.add(User, new_post.author_user_id, "posts_count", 1)
     
     return PostPublic(
         post_id=str(new_post.post_id),
@@ -52,111 +70,65 @@ def create_post(db: Session, post: PostCreate, author_user_id: int, author_usern
         author_user_id=new_post.author_user_id or 0,
         author=author_username,
         highlighted_by_author=new_post.highlighted_by_author,
-        media_urls=media_url_objects,
+        media_urls=sign_media_urls(media_url_objects),
         is_liked=False
     )
 
 # Function to retrieve a post by its ID
 def get_post(post_id: str, current_user: UserPublic, db: Session) -> PostPublic:
-    post = db.query(Post).filter(Post.post_id == post_id).first()
-    
-    #author = db.query(User).filter(User.user_id == post.author_user_id).first()
-
-    #media_urls = db.scalars(select(MediaURL.url).where(MediaURL.post_id == post_id)).all()
-    
-
-    # condensed query using sqlalchemy's Eager Loading strategy
-    post_with_is_liked = (
-        db.query(Post, exists().where(
-        and_(
-            PostLike.post_id == Post.post_id,
-            PostLike.liker_user_id == current_user.user_id
-        )
-        ).label('is_liked'))
-        .options(
-            joinedload(Post.author),
-            selectinload(Post.media_urls)
-        )
-        .filter(Post.post_id == post_id)
-        .first()
-    )
-
-    post, is_liked = post_with_is_liked
-
-    if post is None:
+    posts = hydrate_posts([post_id], current_user, db)
+    if not posts:
         raise PostNotFound
-    
-    refreshed_media_urls = []
-    for media in post.media_urls:
-        try:
-            # Extract object key from URL
-            object_key = media.url.split(s3_bucket)[1].split('?')[0][1:]
-            
-            # Extract timestamp from object key
-            timestamp_str = object_key.split('-')[0]
-            creation_time = datetime.fromtimestamp(int(timestamp_str))
-
-            # Check if the URL is older than 7 days
-            if datetime.now(timezone.utc) - creation_time > timedelta(days=7):
-                # Generate new presigned URL
-                new_presigned_url = s3_client.generate_presigned_url(
-                    'get_object',
-                    Params={'Bucket': s3_bucket, 'Key': object_key},
-                    ExpiresIn=604800  # 7 days
-                )
-                
-                # Update the database
-                media.url = new_presigned_url
-                db.add(media)
-                db.commit()
-                db.refresh(media)
-                refreshed_media_urls.append(media)
-            else:
-                refreshed_media_urls.append(media)
-        except Exception as e:
-            # if parsing fails, just append the original url
-            refreshed_media_urls.append(media)
-
-
-    dt= post.datetime_posted
-    if isinstance(dt, (datetime, date)):
-        # ensure datetime is ISO string, include timezone if present
-        if isinstance(dt, date) and not isinstance(dt, datetime):
-            # convert date -> datetime at midnight
-            dt = datetime(dt.year, dt.month, dt.day)
-        post.datetime_posted= dt.isoformat()
+    return posts[0]
 
 
-    return PostPublic(
-        **post.model_dump(),
-        is_liked = is_liked,
-        author= post.author.username,
-        media_urls = refreshed_media_urls
-    )
+# Several posts in one call (notifications, bookmarks), missing ids are left out
+def get_posts_batch(post_ids: List[str], current_user: UserPublic, db: Session) -> List[dict]:
+    post_ids = list(dict.fromkeys(post_id for post_id in post_ids if post_id))
+    if not post_ids or len(post_ids) > POSTS_BATCH_LIMIT:
+        raise InvalidBatchSize
+    return post_dicts(post_ids, current_user, db)
 
 
 def like_post_repo(post_id: str, liker: UserPublic, db: Session) -> PostLike:
-    # like a post and return a PostLike
-
-    post_like_existing = db.get(PostLike, (post_id, liker.user_id))
-
-    if not post_like_existing:
-        postLike = PostLike(post_id=post_id, liker_user_id=liker.user_id)
-        db.add(postLike)
-        db.commit()
-        db.refresh(postLike)
-        return postLike
-    
-    return post_like_existing
+    # like a post and return a PostLike. One INSERT, a repeated or concurrent like
+    # of the same post is absorbed by ON CONFLICT instead of a primary key error
+    while True:
+        try:
+            inserted = db.execute(
+                dialect_insert(db, PostLike)
+                .values(post_id=post_id, liker_user_id=liker.user_id)
+                .on_conflict_do_nothing(index_elements=["post_id", "liker_user_id"])
+                .returning(PostLike.post_id, PostLike.liker_user_id, PostLike.datetime_liked)
+            ).first()
+            db.commit()
+        except IntegrityError:
+            # the only constraint left to fail is the post foreign key
+            db.rollback()
+            raise PostNotFound
+
+        if inserted is not None:
+            counter_buffer.add(Post, post_id, "like_count", 1)
+            return PostLike(**inserted._mapping)
+
+        # already liked, only now is the existing row read
+        existing = db.get(PostLike, (post_id, liker.user_id))
+        if existing is not None:
+            return existing
+        # a concurrent unlike removed the row in between, like it again
 
 
 def unlike_post_repo(post_id: str, liker: UserPublic, db: Session) -> bool:
-    # unlike a post
-    post_like = db.get(PostLike, (post_id, liker.user_id))
+    # unlike a post, the counter only moves if this call removed the like
+    deleted = db.execute(
+        delete(PostLike)
+        .where(PostLike.post_id == post_id, PostLike.liker_user_id == liker.user_id)
+        .returning(PostLike.post_id)
+    ).first()
+    db.commit()
 
-    if post_like:
-        db.delete(post_like)
-        db.commit()
+    if deleted is not None:
+        counter_buffer.add(Post, post_id, "like_count", -1)
         return True
     
     return False
@@ -194,6 +166,41 @@ def get_likes(post_id: str, db: Session, page: int):
 
     except:
         raise CouldntGetLikes
+
+
+# Keyset paged likes, newest first, on (datetime_liked, liker_user_id)
+def get_likes_cursor(post_id: str, db: Session, cursor: str | None = None) -> dict:
+
+    after = decode_cursor(cursor, (datetime, int)) if cursor else None
+
+    statement = (
+        select(PostLike, User.username)
+        .join(User, PostLike.liker_user_id == User.user_id)
+        .where(PostLike.post_id == post_id)
+    )
+    if after is not None:
+        statement = statement.where(tuple_(PostLike.datetime_liked, PostLike.liker_user_id) < tuple_(*after))
+    statement = (
+        statement
+        .order_by(desc(PostLike.datetime_liked), desc(PostLike.liker_user_id))
+        .limit(LIKE_PAGE_LENGTH + 1)
+    )
+
+    results = db.execute(statement).all()
+    has_more = len(results) > LIKE_PAGE_LENGTH
+    results = results[:LIKE_PAGE_LENGTH]
+
+    likes_with_usernames = []
+    for post_like, username in results:
+        like_dict = post_like.dict()
+        like_dict['liker_username'] = username
+        likes_with_usernames.append(like_dict)
+
+    last_like = results[-1][0] if results else None
+    return {
+        "items": likes_with_usernames,
+        "next_cursor": encode_cursor(last_like.datetime_liked, last_like.liker_user_id) if has_more else None,
+    }
     
 
 
@@ -216,76 +223,123 @@ def get_all_posts(db: Session) -> List[PostPublic]:
 """
 
 
-def get_feed_repo(current_user: UserPublic, db: Session, category: str | None = None, page: int | None = 1) -> List[PostPublic]:
+# Turn an ordered list of post ids into PostPublic objects, keeping the order.
+# Fixed number of queries regardless of how many ids are asked for.
+# Listing fast path: PostPublic shaped plain dicts built straight from column tuples, no ORM
+# objects and no pydantic validation. Routes send them with ORJSONResponse, skipping response_model too.
+def post_dicts(post_ids: List[str], current_user: UserPublic, db: Session) -> List[dict]:
+    if not post_ids:
+        return []
+
+    # three queries whatever the number of posts: posts with authors, the viewer's likes, media
+    statement = (
+        select(
+            Post.post_id, Post.caption, Post.post_category, Post.datetime_posted, Post.author_user_id,
+            Post.highlighted_by_author, Post.like_count, Post.comment_count, User.username,
+        )
+        .join(User, Post.author_user_id == User.user_id)
+        .where(Post.post_id.in_(post_ids))
+    )
+    rows = db.execute(statement).all()
+
+    liked = set(db.scalars(
+        select(PostLike.post_id)
+        .where(PostLike.liker_user_id == current_user.user_id, PostLike.post_id.in_(post_ids))
+    ).all())
+
+    media_by_post = {}
+    for post_id, url, media_type in db.execute(
+        select(MediaURL.post_id, MediaURL.url, MediaURL.media_type).where(MediaURL.post_id.in_(post_ids))
+    ):
+        media_by_post.setdefault(post_id, []).append({"post_id": post_id, "url": presign(url), "media_type": media_type})
+
+    posts_by_id = {
+        post_id: {
+            "post_id": post_id,
+            "caption": caption,
+            "post_category": category,
+            "datetime_posted": posted.isoformat(),
+            "author_user_id": author_user_id,
+            "highlighted_by_author": highlighted,
+            "is_liked": post_id in liked,
+            "media_urls": media_by_post.get(post_id, []),
+            "author": username,
+            "like_count": like_count,
+            "comment_count": comment_count,
+        }
+        for post_id, caption, category, posted, author_user_id, highlighted, like_count, comment_count, username in rows
+    }
+
+    return [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id]
+
+
+def hydrate_posts(post_ids: List[str], current_user: UserPublic, db: Session) -> List[PostPublic]:
+    return [PostPublic(**post) for post in post_dicts(post_ids, current_user, db)]
+
+
+def get_feed_repo(current_user: UserPublic, db: Session, category: str | None = None, page: int | None = 1) -> List[dict]:
 
     if page is not None and page < 1:
         raise InvalidPageLength
     elif page is None:
         page = 1
 
-
-    # Get users that current user follows
-    following_ids = db.query(FollowRequest.requested_user_id).filter(
-        FollowRequest.requester_user_id == current_user.user_id,
-        FollowRequest.status == "accepted"
-    ).all()
-    following_ids = [uid for (uid,) in following_ids]
-    
-
-    if category is not None and is_valid_category(category):
-        statement = (
-            select(
-                Post,
-                User.username,
-                func.string_agg(MediaURL.url, ',').label("media_urls"),
-                PostLike.datetime_liked.label("is_liked"),
-            )
-            .join(User, Post.author_user_id == User.user_id)
-            .outerjoin(MediaURL, Post.post_id == MediaURL.post_id)
-            .outerjoin(PostLike, and_(PostLike.post_id == Post.post_id, PostLike.liker_user_id == current_user.user_id))
-            .group_by(Post.post_id, Post.author_user_id, User.username, PostLike.datetime_liked)
-            .where(and_(Post.author_user_id.in_(following_ids), Post.post_category == category))
-            .order_by(
-                desc(Post.datetime_posted))
-            .offset(
-                (page - 1) * FEED_PAGE_LENGTH)
-            .limit(FEED_PAGE_LENGTH)
-        )
-    elif category is not None:
+    if category is not None and not is_valid_category(category):
         raise InvalidCategory
+
+    offset = (page - 1) * FEED_PAGE_LENGTH
+    # friends first: the newest FEED_CANDIDATES timeline entries, ranked when page 1 is
+    # asked for and kept for the pages after it (see feed_ranker.py)
+    ranked = ranked_feed(db, current_user.user_id, category, fresh=page == 1)
+    if offset < FEED_CANDIDATES:
+        post_ids = ranked.post_ids[offset:offset + FEED_PAGE_LENGTH]
+    elif ranked.boundary is None:
+        post_ids = []
     else:
-        statement = (
-            select(
-                Post,
-                User.username,
-                func.string_agg(MediaURL.url, ',').label("media_urls"),
-                PostLike.datetime_liked.label("is_liked"),
-            )
-            .join(User, Post.author_user_id == User.user_id)
-            .outerjoin(MediaURL, Post.post_id == MediaURL.post_id)
-            .outerjoin(PostLike, and_(PostLike.post_id == Post.post_id, PostLike.liker_user_id == current_user.user_id))
-            .group_by(Post.post_id, Post.author_user_id, User.username, PostLike.datetime_liked)
-            .where(Post.author_user_id.in_(following_ids))
-            .order_by(
-                desc(Post.datetime_posted))
-            .offset(
-                (page - 1) * FEED_PAGE_LENGTH)
-            .limit(FEED_PAGE_LENGTH)
+        # the timeline is filled by create_post, so an older page is just an index range scan.
+        # Counted from the ranked window's oldest entry, posts added since don't shift it.
+        entries = get_timeline_page(
+            db,
+            owner_user_id=current_user.user_id,
+            offset=offset - FEED_CANDIDATES,
+            limit=FEED_PAGE_LENGTH,
+            category=category,
+            after=ranked.boundary,
         )
+        post_ids = [post_id for post_id, _ in entries]
 
-    posts = list(db.execute(statement).all())
+    return post_dicts(post_ids, current_user, db)
 
-    posts = list(map(lambda x: PostPublic(**x[0].model_dump(), author = x[1], datetime_posted= x[0].datetime_posted.isoformat(), media_urls = x[2].split(','), is_liked = True if x[3] is not None else False), posts))
 
-    #print("\n\n\ngot posts: ", posts, type(posts), type(posts[0]))
+# Keyset paged feed, cost stays flat however deep the client scrolls
+def get_feed_cursor_repo(current_user: UserPublic, db: Session, category: str | None = None, cursor: str | None = None) -> dict:
 
-    
-    return posts
+    if category is not None and not is_valid_category(category):
+        raise InvalidCategory
+
+    after = decode_cursor(cursor, (datetime, str)) if cursor else None
+
+    # one extra row tells us whether there is a next page
+    entries = get_timeline_page(
+        db,
+        owner_user_id=current_user.user_id,
+        limit=FEED_PAGE_LENGTH + 1,
+        category=category,
+        after=after,
+    )
+    has_more = len(entries) > FEED_PAGE_LENGTH
+    entries = entries[:FEED_PAGE_LENGTH]
+
+    return {
+        "items": post_dicts([post_id for post_id, _ in entries], current_user, db),
+        "next_cursor": encode_cursor(entries[-1][1], entries[-1][0]) if has_more else None,
+    }
 
 
 # Function to update a post
 def update_post(db: Session, post_id: str, updated_data: Post) -> PostPublic | None:
-    post = db.query(Post).filter(Post.post_id == post_id).first()
+    loader = get_loader(db)
+    post = loader.post(post_id)
     if post is None:
         return None  # Return None if the post is not found
     
@@ -296,26 +350,32 @@ def update_post(db: Session, post_id: str, updated_data: Post) -> PostPublic | N
     
     db.commit()  # Commit the changes to the database
     db.refresh(post)  # Refresh the instance to get the latest data
+    index_post(post.post_id, post.caption)
     
     return PostPublic(
         post_id=post.post_id,
-        media_urls=post.media_urls,
+        media_urls=sign_media_urls(post.media_urls),
         caption=post.caption,
         post_category=post.post_category,
         datetime_posted=post.datetime_posted.isoformat(),
         author_user_id=post.author_user_id,
         highlighted_by_author= post.highlighted_by_author,
-        author= post.author.username,
+        author= loader.user(post.author_user_id).username,
         is_liked=None
     )
 
 # Function to delete a post
 def delete_post(db: Session, post_id: str) -> bool:
-    post = db.query(Post).filter(Post.post_id == post_id).first()
+    loader = get_loader(db)
+    post = loader.post(post_id)
     if post is None:
         return False  # Return False if the post is not found
     
+    remove_post_from_timelines(db, post_id)
     db.delete(post)  # Delete the post from the session
     db.commit()  # Commit the changes to the database
+    loader.forget_post(post_id)
+    unindex_post(post_id)
+    counter_buffer.add(User, post.author_user_id, "posts_count", -1)
     return True  # Return True to indicate successful deletion
 
@@ -1,10 +1,20 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
-from ...lib.models import Topic, Question, QuestionType, SectionQuestionLink, TopicGroup
+from sqlalchemy import select
+from ...lib.models import Topic, Question, QuestionType, SectionQuestionLink, TopicGroup, ExamSection
 from ...lib.schemas import QuestionCreate, TopicPublic, QuestionPublic
-from typing import List, Dict
-import random
-from uuid import uuid4
+from ...lib.cache import VersionedCache
+from .question_sampler import question_sampler
+from .search_index import index_questions, unindex_questions
+from .exams import invalidate_compiled_exams
+from .question_ingest import insert_question_batch, iter_ndjson_questions, INGEST_BATCH_SIZE
+from fastapi.concurrency import run_in_threadpool
+from typing import AsyncIterator, List, Dict
+from os import getenv
+
+# Groups and topic stats only change through the admin writes below, which invalidate this
+QUESTION_BANK_CACHE_TTL = float(getenv("OUTSTAGRAM_QUESTION_BANK_CACHE_TTL", "300"))
+question_bank_cache = VersionedCache(ttl=QUESTION_BANK_CACHE_TTL)
 
 def get_all_groups(db: Session) -> List[str]:
     groups = db.query(TopicGroup).all()
@@ -32,6 +42,7 @@ def assign_topic_to_group(db: Session, topic_slug: str, group_name: str):
     if topic and group not in topic.groups:
         topic.groups.append(group)
         db.commit()
+        question_bank_cache.invalidate()
 
 def get_topics_with_stats(db: Session) -> List[TopicPublic]:
     results = db.query(
@@ -47,22 +58,21 @@ def sample_questions_from_topic(db: Session, topic_slug: str, count: int, easy_c
     if not topic:
         return []
 
-    sampled_questions = []
-
-    # If specific counts are provided, use them for weighted sampling
+    # ids are drawn from the in-memory pools, only the drawn rows are read from the database
     if easy_count > 0 or medium_count > 0 or hard_count > 0:
-        if easy_count > 0:
-            questions = db.query(Question).filter(Question.topic_id == topic.topic_id, Question.difficulty == 'easy').order_by(func.random()).limit(easy_count).all()
-            sampled_questions.extend(questions)
-        if medium_count > 0:
-            questions = db.query(Question).filter(Question.topic_id == topic.topic_id, Question.difficulty == 'medium').order_by(func.random()).limit(medium_count).all()
-            sampled_questions.extend(questions)
-        if hard_count > 0:
-            questions = db.query(Question).filter(Question.topic_id == topic.topic_id, Question.difficulty == 'hard').order_by(func.random()).limit(hard_count).all()
-            sampled_questions.extend(questions)
+        sampled_ids = (
+            question_sampler.sample(db, topic.topic_id, easy_count, 'easy')
+            + question_sampler.sample(db, topic.topic_id, medium_count, 'medium')
+            + question_sampler.sample(db, topic.topic_id, hard_count, 'hard')
+        )
     else:
         # Fallback to random sampling if no specific counts are provided
-        sampled_questions = db.query(Question).filter(Question.topic_id == topic.topic_id).order_by(func.random()).limit(count).all()
+        sampled_ids = question_sampler.sample(db, topic.topic_id, count)
+
+    questions_by_id = {}
+    if sampled_ids:
+        questions_by_id = {q.id: q for q in db.query(Question).filter(Question.id.in_(sampled_ids)).all()}
+    sampled_questions = [questions_by_id[q_id] for q_id in sampled_ids if q_id in questions_by_id]
     
     return [
         QuestionPublic(
@@ -81,7 +91,7 @@ def sample_questions_from_topic(db: Session, topic_slug: str, count: int, easy_c
         ) for q in sampled_questions
     ]
 
-def add_questions_to_topic(db: Session, topic_slug: str, questions: List[QuestionCreate]) -> dict:
+def _get_or_create_topic(db: Session, topic_slug: str) -> Topic:
     topic = db.query(Topic).filter(Topic.slug == topic_slug).first()
     if not topic:
         # Create topic if it doesn't exist, using slug as name if name not provided
@@ -89,71 +99,58 @@ def add_questions_to_topic(db: Session, topic_slug: str, questions: List[Questio
         db.add(topic)
         db.commit()
         db.refresh(topic)
+    return topic
+
+# Insert and commit one batch, keeping the sampler pools in step
+def _ingest_batch(db: Session, topic_id: int, questions: List[QuestionCreate], unique: bool) -> int:
+    inserted = insert_question_batch(db, topic_id, questions, unique=unique)
+    db.commit()
+    question_sampler.add(topic_id, inserted)
+    index_questions(db, [question_id for question_id, _ in inserted])
+    return len(inserted)
+
+def _ingest(db: Session, topic_slug: str, questions: List[QuestionCreate], unique: bool) -> dict:
+    topic = _get_or_create_topic(db, topic_slug)
     
     added_count = 0
-    for q_data in questions:
-        new_q = Question(
-            id=str(uuid4()),
-            type=q_data.type,
-            difficulty=q_data.difficulty,
-            question=q_data.question,
-            options=q_data.options,
-            answer_label=q_data.answer_label,
-            answer_labels=q_data.answer_labels,
-            answer_range=q_data.answer_range,
-            answer_value=q_data.answer_value,
-            topic_id=topic.topic_id,
-            explanation=q_data.explanation,
-            image_path=q_data.image_path
-        )
-        db.add(new_q)
-        added_count += 1
-    
-    db.commit()
+    try:
+        for i in range(0, len(questions), INGEST_BATCH_SIZE):
+            added_count += _ingest_batch(db, topic.topic_id, questions[i:i + INGEST_BATCH_SIZE], unique)
+    finally:
+        question_bank_cache.invalidate()
     
     total_count = db.query(func.count(Question.id)).filter(Question.topic_id == topic.topic_id).scalar()
     
     return {"success": True, "added": added_count, "total": total_count}
 
+def add_questions_to_topic(db: Session, topic_slug: str, questions: List[QuestionCreate]) -> dict:
+    return _ingest(db, topic_slug, questions, unique=False)
+
 def add_unique_questions_to_topic(db: Session, topic_slug: str, questions: List[QuestionCreate]) -> dict:
-    topic = db.query(Topic).filter(Topic.slug == topic_slug).first()
-    if not topic:
-        topic = Topic(name=topic_slug.replace("_", " ").title(), slug=topic_slug)
-        db.add(topic)
-        db.commit()
-        db.refresh(topic)
-    
-    # Get existing question texts for this topic to check for duplicates
-    existing_questions = db.query(Question.question).filter(Question.topic_id == topic.topic_id).all()
-    existing_question_texts = {q[0] for q in existing_questions}
+    # Questions whose text is already in the topic (or earlier in the batch) are skipped by the database
+    return _ingest(db, topic_slug, questions, unique=True)
+
+# Streamed NDJSON import, one question per line. Memory is bounded by one batch whatever the
+# upload size, and each batch is committed on its own, so a failed import can simply be re-sent
+# with unique=True.
+async def import_questions_ndjson(db: Session, topic_slug: str, chunks: AsyncIterator[bytes], unique: bool = True) -> dict:
+    topic = await run_in_threadpool(_get_or_create_topic, db, topic_slug)
     
     added_count = 0
-    for q_data in questions:
-        # Check if the question text already exists in this topic
-        if q_data.question in existing_question_texts:
-            continue
-            
-        new_q = Question(
-            id=str(uuid4()),
-            type=q_data.type,
-            difficulty=q_data.difficulty,
-            question=q_data.question,
-            options=q_data.options,
-            answer_label=q_data.answer_label,
-            answer_labels=q_data.answer_labels,
-            answer_range=q_data.answer_range,
-            answer_value=q_data.answer_value,
-            topic_id=topic.topic_id,
-            explanation=q_data.explanation,
-            image_path=q_data.image_path
-        )
-        db.add(new_q)
-        existing_question_texts.add(q_data.question) # Update set to avoid duplicates in the same batch
-        added_count += 1
-    
-    db.commit()
-    
-    total_count = db.query(func.count(Question.id)).filter(Question.topic_id == topic.topic_id).scalar()
+    batch = []
+    try:
+        async for q_data in iter_ndjson_questions(chunks):
+            batch.append(q_data)
+            if len(batch) >= INGEST_BATCH_SIZE:
+                added_count += await run_in_threadpool(_ingest_batch, db, topic.topic_id, batch, unique)
+                batch = []
+        added_count += await run_in_threadpool(_ingest_batch, db, topic.topic_id, batch, unique)
+    finally:
+        question_bank_cache.invalidate()
+    
+    total_count = await run_in_threadpool(
+        lambda: db.query(func.count(Question.id)).filter(Question.topic_id == topic.topic_id).scalar()
+    )
     
     return {"success": True, "added": added_count, "total": total_count}
 
@@ -169,6 +166,11 @@ def delete_questions_from_topic(db: Session, topic_slug: str) -> dict:
     if not question_ids:
         return {"success": True, "deleted": 0}
         
+    # Exams that lose questions here, their compiled responses are dropped after the commit
+    exam_ids = [exam_id for (exam_id,) in db.query(ExamSection.exam_id).join(
+        SectionQuestionLink, SectionQuestionLink.section_id == ExamSection.id
+    ).filter(SectionQuestionLink.question_id.in_(question_ids)).distinct()]
+
     # Delete links to exam sections
     db.query(SectionQuestionLink).filter(SectionQuestionLink.question_id.in_(question_ids)).delete(synchronize_session=False)
     
@@ -176,5 +178,35 @@ def delete_questions_from_topic(db: Session, topic_slug: str) -> dict:
     deleted_count = db.query(Question).filter(Question.topic_id == topic.topic_id).delete(synchronize_session=False)
     
     db.commit()
+    question_bank_cache.invalidate()
+    question_sampler.drop_topic(topic.topic_id)
+    unindex_questions(question_ids)
+    invalidate_compiled_exams(exam_ids)
     
     return {"success": True, "deleted": deleted_count}
+
+# Questions filed under more than one topic: same normalized text and options, found by
+# grouping on the content hash index instead of comparing texts
+def find_cross_topic_duplicates(db: Session, limit: int = 100) -> List[dict]:
+    shared_hashes = (
+        select(Question.content_hash)
+        .where(Question.content_hash.is_not(None))
+        .group_by(Question.content_hash)
+        .having(func.count(func.distinct(Question.topic_id)) > 1)
+        .order_by(Question.content_hash)
+        .limit(limit)
+    )
+    rows = (
+        db.query(Question.content_hash, Question.id, Question.question, Topic.slug)
+        .join(Topic, Topic.topic_id == Question.topic_id)
+        .filter(Question.content_hash.in_(shared_hashes))
+        .order_by(Question.content_hash, Topic.slug)
+        .all()
+    )
+    
+    groups: Dict[str, dict] = {}
+    for content_hash, question_id, question, topic_slug in rows:
+        group = groups.setdefault(content_hash, {"content_hash": content_hash, "question": question, "copies": []})
+        group["copies"].append({"id": question_id, "topic": topic_slug})
+    return list(groups.values())
+
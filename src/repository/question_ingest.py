@@ -0,0 +1,90 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from pydantic import ValidationError
+from ...lib.models import Question
+from ...lib.schemas import QuestionCreate
+from ...lib.database_connection import dialect_insert
+from ...lib.exceptions import InvalidQuestionLine
+from typing import AsyncIterator, List, Tuple
+from uuid import uuid4
+import hashlib
+import unicodedata
+
+# Rows per INSERT, 500 x 13 columns stays well under the bind parameter limits
+INGEST_BATCH_SIZE = 500
+
+
+def normalize_question_text(text: str) -> str:
+    # NFKC folds look-alike characters, then case and runs of whitespace are ignored
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+# Identity of a question for deduplication: its normalized text plus its normalized options,
+# ordered by label. The same question re-typed with other spacing or casing hashes the same.
+def question_content_hash(question: str, options: List[dict] | None = None) -> str:
+    parts = [normalize_question_text(question)]
+    for option in sorted(options or [], key=lambda option: str(option.get("label"))):
+        parts.append(f"{option.get('label')}:{normalize_question_text(str(option.get('value', '')))}")
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+def _question_row(topic_id: int, q_data: QuestionCreate) -> dict:
+    return {
+        "id": str(uuid4()),
+        "type": q_data.type,
+        "difficulty": q_data.difficulty,
+        "question": q_data.question,
+        "options": q_data.options,
+        "answer_label": q_data.answer_label,
+        "answer_labels": q_data.answer_labels,
+        "answer_range": q_data.answer_range,
+        "answer_value": q_data.answer_value,
+        "topic_id": topic_id,
+        "explanation": q_data.explanation,
+        "image_path": q_data.image_path,
+        "content_hash": question_content_hash(q_data.question, q_data.options),
+    }
+
+
+# Insert a batch in one statement, the unique (topic_id, content_hash) index drops questions
+# already in the topic or repeated in the batch. With unique=False those are appended anyway,
+# without a hash. Returns (id, difficulty) of the inserted rows. Caller commits.
+def insert_question_batch(db: Session, topic_id: int, questions: List[QuestionCreate], unique: bool = True) -> List[Tuple[str, str]]:
+    if not questions:
+        return []
+    rows = [_question_row(topic_id, q_data) for q_data in questions]
+    inserted = db.execute(
+        dialect_insert(db, Question)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["topic_id", "content_hash"])
+        .returning(Question.id, Question.difficulty)
+    ).all()
+
+    if not unique and len(inserted) < len(rows):
+        inserted_ids = {question_id for question_id, _ in inserted}
+        duplicates = [dict(row, content_hash=None) for row in rows if row["id"] not in inserted_ids]
+        inserted += db.execute(insert(Question).values(duplicates).returning(Question.id, Question.difficulty)).all()
+
+    return [(question_id, difficulty) for question_id, difficulty in inserted]
+
+
+# Split a streamed NDJSON body into questions, one per line. Blank lines are skipped.
+async def iter_ndjson_questions(chunks: AsyncIterator[bytes]) -> AsyncIterator[QuestionCreate]:
+    line_number = 0
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield _parse_line(line, line_number)
+    if pending.strip():
+        yield _parse_line(pending, line_number + 1)
+
+
+def _parse_line(line: bytes, line_number: int) -> QuestionCreate:
+    try:
+        return QuestionCreate.model_validate_json(line)
+    except ValidationError as e:
+        raise InvalidQuestionLine(f"Line {line_number} is not a valid question: {e.errors()[0]['msg']}")
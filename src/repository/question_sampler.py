@@ -0,0 +1,86 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from ...lib.models import Question
+from os import getenv
+from typing import Dict, Iterable, List, Tuple
+import random
+import threading
+import time
+
+# Other workers' writes only reach this process' pools when they are reloaded
+QUESTION_SAMPLER_TTL = float(getenv("OUTSTAGRAM_QUESTION_SAMPLER_TTL", "600"))
+
+
+def draw_without_replacement(ids: List[str], k: int) -> List[str]:
+    # Partial Fisher-Yates over a virtual copy of `ids`: only the swapped slots are
+    # remembered, so a draw is O(k) in time and memory whatever the pool size.
+    n = len(ids)
+    k = min(k, n)
+    swapped: Dict[int, str] = {}
+    drawn = []
+    for i in range(k):
+        j = random.randrange(i, n)
+        drawn.append(swapped.get(j, ids[j]))
+        swapped[j] = swapped.get(i, ids[i])
+    return drawn
+
+
+class QuestionSampler:
+    """
+    In-memory id pools per (topic, difficulty), so a random sample never sorts the topic.
+    A topic is loaded on first use with one narrow `SELECT id, difficulty` and then
+    kept up to date by the question bank writes. Pools are reloaded after the TTL.
+    """
+
+    def __init__(self, ttl: float = QUESTION_SAMPLER_TTL):
+        self.ttl = ttl
+        # topic_id -> (loaded at, difficulty -> ids), difficulty None holds every id of the topic
+        self._topics: Dict[int, Tuple[float, Dict[str | None, List[str]]]] = {}
+        self._lock = threading.Lock()
+
+    def _pools(self, db: Session, topic_id: int) -> Dict[str | None, List[str]]:
+        entry = self._topics.get(topic_id)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+
+        # loaded from the primary: a pool is dropped or expires right after writes, a lagging
+        # replica would refill it without them until the TTL runs out again
+        db.info["read_only"] = False
+        pools: Dict[str | None, List[str]] = {None: []}
+        rows = db.execute(select(Question.id, Question.difficulty).where(Question.topic_id == topic_id)).all()
+        for question_id, difficulty in rows:
+            pools[None].append(question_id)
+            pools.setdefault(_difficulty_key(difficulty), []).append(question_id)
+
+        with self._lock:
+            self._topics[topic_id] = (time.monotonic(), pools)
+        return pools
+
+    def sample(self, db: Session, topic_id: int, k: int, difficulty: str | None = None) -> List[str]:
+        if k <= 0:
+            return []
+        pool = self._pools(db, topic_id).get(difficulty, [])
+        return draw_without_replacement(pool, k)
+
+    def add(self, topic_id: int, questions: Iterable[Tuple[str, str]]) -> None:
+        # (id, difficulty) pairs of freshly inserted questions. Topics not loaded yet
+        # will pick them up when they are first sampled.
+        with self._lock:
+            entry = self._topics.get(topic_id)
+            if entry is None:
+                return
+            pools = entry[1]
+            for question_id, difficulty in questions:
+                pools[None].append(question_id)
+                pools.setdefault(_difficulty_key(difficulty), []).append(question_id)
+
+    def drop_topic(self, topic_id: int) -> None:
+        with self._lock:
+            self._topics.pop(topic_id, None)
+
+
+def _difficulty_key(difficulty) -> str:
+    return getattr(difficulty, "value", difficulty)
+
+
+question_sampler = QuestionSampler()
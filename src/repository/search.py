@@ -0,0 +1,86 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import literal_column, literal, tuple_, cast, Double
+from sqlmodel import select, func, desc
+from ...lib.models import Post, Question, Topic
+from ...lib.schemas import UserPublic, QuestionPublic
+from ...lib.constants import SEARCH_PAGE_LENGTH
+from ...lib.pagination import encode_cursor, decode_cursor
+from .posts import post_dicts
+from .search_index import loaded_post_index, loaded_question_index
+from typing import List, Tuple
+
+# Must stay identical to the expressions of the GIN indexes (alembic revision 3c8e1f5a7d29),
+# otherwise Postgres cannot use them
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+POST_DOCUMENT = func.to_tsvector(SEARCH_CONFIG, func.coalesce(Post.caption, literal_column("''")))
+QUESTION_DOCUMENT = func.setweight(func.to_tsvector(SEARCH_CONFIG, Question.question), literal_column("'A'")).op("||")(
+    func.setweight(func.to_tsvector(SEARCH_CONFIG, func.coalesce(Question.explanation, literal_column("''"))), literal_column("'B'"))
+)
+
+
+def _uses_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+# One ranked page of (rank, id), best first. Postgres ranks with ts_rank_cd over the GIN
+# indexed document, the fallback with BM25; either way the cursor is the last (rank, id).
+def _ranked_ids(db: Session, document, id_column, index_loader, query: str, cursor: str | None) -> Tuple[List[str], str | None]:
+    after = decode_cursor(cursor, (float, str)) if cursor else None
+
+    if _uses_postgres(db):
+        tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+        # ts_rank_cd is a float4, whose shortest text form is not the value it promotes to
+        # as a float8. Ranking on the float8 makes the cursor's rank round-trip exactly, so
+        # rows tied with the last one served are neither skipped nor repeated.
+        rank = cast(func.ts_rank_cd(document, tsquery), Double)
+        statement = select(rank, id_column).where(document.op("@@")(tsquery))
+        if after is not None:
+            statement = statement.where(tuple_(rank, id_column) < tuple_(literal(after[0], Double), after[1]))
+        hits = db.execute(statement.order_by(desc(rank), desc(id_column)).limit(SEARCH_PAGE_LENGTH + 1)).all()
+    else:
+        hits = index_loader(db).search(query, SEARCH_PAGE_LENGTH + 1, after)
+
+    has_more = len(hits) > SEARCH_PAGE_LENGTH
+    hits = hits[:SEARCH_PAGE_LENGTH]
+    next_cursor = encode_cursor(float(hits[-1][0]), hits[-1][1]) if has_more else None
+    return [doc_id for _, doc_id in hits], next_cursor
+
+
+def search_posts(query: str, current_user: UserPublic, db: Session, cursor: str | None = None) -> dict:
+    post_ids, next_cursor = _ranked_ids(db, POST_DOCUMENT, Post.post_id, loaded_post_index, query, cursor)
+    return {
+        "items": post_dicts(post_ids, current_user, db),
+        "next_cursor": next_cursor,
+    }
+
+
+def search_questions(query: str, db: Session, cursor: str | None = None) -> dict:
+    question_ids, next_cursor = _ranked_ids(db, QUESTION_DOCUMENT, Question.id, loaded_question_index, query, cursor)
+
+    rows = {}
+    if question_ids:
+        statement = (
+            select(Question, Topic.name)
+            .join(Topic, Topic.topic_id == Question.topic_id)
+            .where(Question.id.in_(question_ids))
+        )
+        rows = {q.id: (q, topic_name) for q, topic_name in db.execute(statement).all()}
+
+    items = [
+        QuestionPublic(
+            id=q.id,
+            type=q.type,
+            difficulty=q.difficulty,
+            question=q.question,
+            options=q.options,
+            answer_label=q.answer_label,
+            answer_labels=q.answer_labels,
+            answer_range=q.answer_range,
+            answer_value=q.answer_value,
+            topic=topic_name,
+            explanation=q.explanation,
+            image_path=q.image_path
+        )
+        for q, topic_name in (rows[q_id] for q_id in question_ids if q_id in rows)
+    ]
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,149 @@
+from sqlalchemy.orm import Session
+from sqlmodel import select
+from ...lib.models import Post, Question
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Tuple
+import math
+import re
+import threading
+
+_WORD = re.compile(r"\w+")
+# the common words Postgres' english configuration drops as well
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i if in into is it its of on or so such that the their "
+    "then there these they this to was were what when which who will with you your".split()
+)
+
+
+def tokenize(text: str | None) -> List[str]:
+    return [word for word in _WORD.findall((text or "").casefold()) if word not in STOPWORDS]
+
+
+class InvertedIndex:
+    """
+    In-memory BM25 index over short texts, the search backend when the database is not
+    Postgres (SQLite in tests and local runs). It is loaded from the table on first search
+    and then kept up to date by the write paths; until loaded, updates are ignored.
+    Per process, like the other in-memory caches, so it only suits single worker setups.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ready = False
+        # term -> {doc id -> term frequency}
+        self._postings: Dict[str, Dict[Hashable, int]] = {}
+        # doc id -> (length in terms, distinct terms), so a document is removed without a scan
+        self._documents: Dict[Hashable, Tuple[int, Tuple[str, ...]]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def build(self, documents: Iterable[Tuple[Hashable, str | None]]) -> None:
+        with self._lock:
+            self._postings, self._documents, self._total_length = {}, {}, 0
+            for doc_id, text in documents:
+                self._add(doc_id, text)
+            self.ready = True
+
+    def add(self, doc_id: Hashable, text: str | None) -> None:
+        if not self.ready:
+            return
+        with self._lock:
+            self._remove(doc_id)
+            self._add(doc_id, text)
+
+    def remove(self, doc_id: Hashable) -> None:
+        if not self.ready:
+            return
+        with self._lock:
+            self._remove(doc_id)
+
+    def _add(self, doc_id: Hashable, text: str | None) -> None:
+        terms = Counter(tokenize(text))
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = frequency
+        length = sum(terms.values())
+        self._documents[doc_id] = (length, tuple(terms))
+        self._total_length += length
+
+    def _remove(self, doc_id: Hashable) -> None:
+        document = self._documents.pop(doc_id, None)
+        if document is None:
+            return
+        length, terms = document
+        self._total_length -= length
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str, limit: int, after: Tuple[float, Hashable] | None = None) -> List[Tuple[float, Hashable]]:
+        # every query term must match, like websearch_to_tsquery; ordered by score then id, descending
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            if not postings or not all(postings):
+                return []
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+
+            count = len(self._documents)
+            average_length = self._total_length / count
+            scored = []
+            for doc_id in candidates:
+                norm = self.k1 * (1 - self.b + self.b * self._documents[doc_id][0] / average_length)
+                score = 0.0
+                for term_postings in postings:
+                    frequency = term_postings[doc_id]
+                    idf = math.log(1 + (count - len(term_postings) + 0.5) / (len(term_postings) + 0.5))
+                    score += idf * frequency * (self.k1 + 1) / (frequency + norm)
+                scored.append((score, doc_id))
+
+        if after is not None:
+            scored = [hit for hit in scored if hit < after]
+        scored.sort(reverse=True)
+        return scored[:limit]
+
+
+post_index = InvertedIndex()
+question_index = InvertedIndex()
+
+
+def loaded_post_index(db: Session) -> InvertedIndex:
+    if not post_index.ready:
+        post_index.build(db.execute(select(Post.post_id, Post.caption)).all())
+    return post_index
+
+
+def loaded_question_index(db: Session) -> InvertedIndex:
+    if not question_index.ready:
+        question_index.build(
+            (question_id, f"{question} {explanation or ''}")
+            for question_id, question, explanation in db.execute(select(Question.id, Question.question, Question.explanation))
+        )
+    return question_index
+
+
+# Write path hooks. Postgres keeps its GIN expression indexes current by itself,
+# these only matter for the in-memory fallback once it has been loaded.
+def index_post(post_id: str, caption: str | None) -> None:
+    post_index.add(post_id, caption)
+
+
+def unindex_post(post_id: str) -> None:
+    post_index.remove(post_id)
+
+
+def index_questions(db: Session, question_ids: List[str]) -> None:
+    if not question_index.ready or not question_ids:
+        return
+    for question_id, question, explanation in db.execute(
+        select(Question.id, Question.question, Question.explanation).where(Question.id.in_(question_ids))
+    ):
+        question_index.add(question_id, f"{question} {explanation or ''}")
+
+
+def unindex_questions(question_ids: List[str]) -> None:
+    for question_id in question_ids:
+        question_index.remove(question_id)
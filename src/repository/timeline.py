@@ -0,0 +1,91 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, literal, tuple_
+from sqlmodel import select, desc
+from ...lib.models import Post, FollowRequest, FollowRequestStatus, TimelineEntry
+from ...lib.constants import TIMELINE_BACKFILL_LENGTH
+from ...lib.database_connection import dialect_insert
+from datetime import datetime
+from typing import List, Tuple
+
+
+# Fan-out-on-write: copy a new post's id into the timeline of every accepted follower.
+# Runs inside the caller's transaction, the caller commits. A follow approved at the same
+# moment may have backfilled the entry already, ON CONFLICT keeps the first one.
+def fan_out_post(db: Session, post: Post) -> None:
+    followers = (
+        select(
+            FollowRequest.requester_user_id,
+            literal(post.post_id),
+            literal(post.author_user_id),
+            literal(post.datetime_posted, TimelineEntry.__table__.c.datetime_posted.type),
+        )
+        .where(
+            FollowRequest.requested_user_id == post.author_user_id,
+            FollowRequest.status == FollowRequestStatus.accepted,
+        )
+    )
+    db.execute(
+        dialect_insert(db, TimelineEntry).from_select(
+            ["owner_user_id", "post_id", "author_user_id", "datetime_posted"],
+            followers,
+        ).on_conflict_do_nothing(index_elements=["owner_user_id", "post_id"])
+    )
+
+
+# Pull the author's latest posts into a new follower's timeline, so the feed
+# isn't empty until the author posts again. Caller commits. Entries a concurrent
+# fan_out_post wrote first are skipped by ON CONFLICT.
+def backfill_timeline(db: Session, owner_user_id: int, author_user_id: int, limit: int = TIMELINE_BACKFILL_LENGTH) -> None:
+    latest_posts = (
+        select(
+            literal(owner_user_id),
+            Post.post_id,
+            Post.author_user_id,
+            Post.datetime_posted,
+        )
+        .where(Post.author_user_id == author_user_id)
+        .order_by(desc(Post.datetime_posted))
+        .limit(limit)
+    )
+    db.execute(
+        dialect_insert(db, TimelineEntry).from_select(
+            ["owner_user_id", "post_id", "author_user_id", "datetime_posted"],
+            latest_posts,
+        ).on_conflict_do_nothing(index_elements=["owner_user_id", "post_id"])
+    )
+
+
+# Drop a post from every timeline it was fanned out to. Caller commits.
+def remove_post_from_timelines(db: Session, post_id: str) -> None:
+    db.execute(delete(TimelineEntry).where(TimelineEntry.post_id == post_id))
+
+
+# One page of a user's timeline as (post_id, datetime_posted) rows, newest first.
+# Pass `after` (the last row of the previous page) for keyset paging instead of offset.
+def get_timeline_page(
+    db: Session,
+    owner_user_id: int,
+    limit: int,
+    offset: int = 0,
+    category: str | None = None,
+    after: Tuple[datetime, str] | None = None,
+) -> List[Tuple[str, datetime]]:
+    statement = (
+        select(TimelineEntry.post_id, TimelineEntry.datetime_posted)
+        .where(TimelineEntry.owner_user_id == owner_user_id)
+    )
+    if category is not None:
+        statement = (
+            statement
+            .join(Post, Post.post_id == TimelineEntry.post_id)
+            .where(Post.post_category == category)
+        )
+    if after is not None:
+        statement = statement.where(tuple_(TimelineEntry.datetime_posted, TimelineEntry.post_id) < tuple_(*after))
+    statement = (
+        statement
+        .order_by(desc(TimelineEntry.datetime_posted), desc(TimelineEntry.post_id))
+        .offset(offset)
+        .limit(limit)
+    )
+    return [(post_id, datetime_posted) for post_id, datetime_posted in db.execute(statement).all()]
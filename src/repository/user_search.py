@@ -0,0 +1,203 @@
+from sqlalchemy.orm import Session
+from sqlmodel import select, or_, desc, func
+from ...lib.models import User, FollowRequest, FollowRequestStatus
+from bisect import insort
+from os import getenv
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+import threading
+import time
+
+# Results kept per prefix, also the largest limit a query can ask for
+USER_SEARCH_TOP_K = int(getenv("OUTSTAGRAM_USER_SEARCH_TOP_K", "10"))
+# false leaves autocomplete on the trigram indexed database query
+USER_SEARCH_INDEX = getenv("OUTSTAGRAM_USER_SEARCH_INDEX", "true").lower() == "true"
+
+
+def _keys(username: str, fullname: str | None) -> List[str]:
+    # matched from their start: the username, the full name and every word of it
+    fullname = " ".join((fullname or "").casefold().split())
+    return [key for key in dict.fromkeys([username.casefold(), fullname, *fullname.split()]) if key]
+
+
+class _Node:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # best ranked users under this prefix, as (-followers, username, user_id), ascending
+        self.top: List[Tuple[int, str, int]] = []
+
+
+class UserSearchIndex:
+    """
+    Prefix trie over usernames, full names and their words. Every node keeps the top_k users
+    below it ranked by follower count, so a query is one walk down the prefix and a
+    slice, with no scan of the matches. Built in the background at startup, then kept
+    current by create_user and follow approvals; until built, queries go to the database.
+    """
+
+    def __init__(self, top_k: int = USER_SEARCH_TOP_K):
+        self.top_k = top_k
+        self.ready = False
+        self._root = _Node()
+        # user_id -> (username, fullname, followers)
+        self._users: Dict[int, Tuple[str, str, int]] = {}
+        # users added while a build is running, replayed on the new trie
+        self._pending: List[Callable[[_Node, Dict], None]] | None = None
+        # users whose follower count changed while a build is running. The scan may or may not
+        # have seen the change, so their counts are read again afterwards instead of replayed.
+        self._touched: Set[int] | None = None
+        self._lock = threading.Lock()
+
+    def build(self, session_factory: Callable[[], Session]) -> None:
+        with self._lock:
+            self._pending, self._touched = [], set()
+        started = time.perf_counter()
+        root, users = _Node(), {}
+        db = session_factory()
+        try:
+            rows = db.execute(
+                select(User.user_id, User.username, User.fullname, User.followers_count)
+                .execution_options(yield_per=10_000)
+            )
+            for user_id, username, fullname, followers in rows:
+                self._insert(root, users, user_id, username, fullname, followers)
+
+            # the recounts below must see the follows just committed, not a lagging replica
+            db.info["read_only"] = False
+            while True:
+                with self._lock:
+                    pending, touched = self._pending, self._touched
+                    if not pending and not touched:
+                        self._root, self._users, self._pending, self._touched = root, users, None, None
+                        self.ready = True
+                        break
+                    self._pending, self._touched = [], set()
+                for apply in pending:
+                    apply(root, users)
+                # follows are committed before adjust_followers is called, so this count has them
+                counts = dict(_count_followers(db, touched)) if touched else {}
+                for user_id in touched:
+                    if user_id in users:
+                        self._adjust(root, users, user_id, counts.get(user_id, 0) - users[user_id][2])
+        finally:
+            db.close()
+        print(f"User search index: {len(users)} users in {time.perf_counter() - started:.1f}s")
+
+    def start(self, session_factory: Callable[[], Session]) -> None:
+        threading.Thread(target=self.build, args=(session_factory,), name="user-search-build", daemon=True).start()
+
+    def add(self, user_id: int, username: str, fullname: str | None, followers: int = 0) -> None:
+        self._apply(lambda root, users: self._insert(root, users, user_id, username, fullname, followers))
+
+    def adjust_followers(self, user_id: int, delta: int) -> None:
+        with self._lock:
+            if self._touched is not None:
+                self._touched.add(user_id)
+            if self.ready:
+                self._adjust(self._root, self._users, user_id, delta)
+
+    def _apply(self, change: Callable[[_Node, Dict], None]) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(change)
+            if self.ready:
+                change(self._root, self._users)
+
+    def _insert(self, root: _Node, users: Dict, user_id: int, username: str, fullname: str | None, followers: int) -> None:
+        if user_id in users:
+            return
+        users[user_id] = (username, fullname, followers)
+        entry = (-followers, username, user_id)
+        for key in _keys(username, fullname):
+            node = root
+            for char in key:
+                node = node.children.setdefault(char, _Node())
+                self._offer(node, entry)
+
+    def _offer(self, node: _Node, entry: Tuple[int, str, int]) -> None:
+        if entry in node.top:
+            return
+        if len(node.top) < self.top_k or entry < node.top[-1]:
+            insort(node.top, entry)
+            del node.top[self.top_k:]
+
+    def _adjust(self, root: _Node, users: Dict, user_id: int, delta: int) -> None:
+        user = users.get(user_id)
+        if user is None:
+            return
+        username, fullname, followers = user
+        if not delta:
+            return
+        old, new = (-followers, username, user_id), (-(followers + delta), username, user_id)
+        users[user_id] = (username, fullname, followers + delta)
+        # a user who drops out of a full top list can leave a better one behind it unlisted,
+        # the next build puts that right; follower counts mostly go up
+        for key in _keys(username, fullname):
+            node = root
+            for char in key:
+                node = node.children[char]
+                if old in node.top:
+                    node.top.remove(old)
+                    insort(node.top, new)
+                else:
+                    self._offer(node, new)
+
+    def search(self, prefix: str, limit: int) -> List[dict]:
+        node = self._root
+        for char in " ".join(prefix.casefold().split()):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [
+            {"user_id": user_id, "username": username, "fullname": self._users[user_id][1], "followers_count": -negative_followers}
+            for negative_followers, username, user_id in node.top[:limit]
+        ]
+
+
+user_search_index = UserSearchIndex()
+
+
+def _count_followers(db: Session, user_ids: Iterable[int]) -> List[Tuple[int, int]]:
+    # from the follow requests themselves, users.followers_count is written behind
+    return db.execute(
+        select(FollowRequest.requested_user_id, func.count())
+        .where(
+            FollowRequest.requested_user_id.in_(list(user_ids)),
+            FollowRequest.status == FollowRequestStatus.accepted,
+        )
+        .group_by(FollowRequest.requested_user_id)
+    ).all()
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Fallback while the trie is not built: ILIKE prefix matches, served by the pg_trgm GIN indexes
+def _search_users_db(db: Session, prefix: str, limit: int) -> List[dict]:
+    pattern = _escape_like(prefix)
+    rows = db.execute(
+        select(User.user_id, User.username, User.fullname, User.followers_count)
+        .where(or_(
+            User.username.ilike(f"{pattern}%", escape="\\"),
+            User.fullname.ilike(f"{pattern}%", escape="\\"),
+            User.fullname.ilike(f"% {pattern}%", escape="\\"),
+        ))
+        .order_by(desc(User.followers_count), User.username)
+        .limit(limit)
+    ).all()
+    return [
+        {"user_id": user_id, "username": username, "fullname": fullname, "followers_count": followers}
+        for user_id, username, fullname, followers in rows
+    ]
+
+
+def search_users(db: Session, prefix: str, limit: int = USER_SEARCH_TOP_K) -> List[dict]:
+    prefix = prefix.strip()
+    limit = min(limit, USER_SEARCH_TOP_K)
+    if not prefix or limit < 1:
+        return []
+    if user_search_index.ready:
+        return user_search_index.search(prefix, limit)
+    return _search_users_db(db, prefix, limit)
@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import or_, and_
-from sqlmodel import select, func, and_, join, outerjoin
+from sqlmodel import select, func, and_, join, outerjoin, desc
+from sqlalchemy import tuple_
+from fastapi import HTTPException
 
 import datetime
 
@@ -8,6 +10,11 @@ from ...lib.models import Post, User, PostLike, MediaURL, FollowRequest
 from ...lib.schemas import UserPublic, PostPublic
 from ...lib.exceptions import CouldntGetDashboard, InvalidPageLength
 from ...lib.constants import USER_POSTS_PAGE_LENGTH
+from ...lib.pagination import encode_cursor, decode_cursor
+from ...lib.presign import presign
+from .posts import post_dicts
+from .loader import get_loader
+from .follow_graph import follow_graph, has_edge
 
 def get_dashboard(user: UserPublic, db: Session, page: int):
 
@@ -16,120 +23,86 @@ def get_dashboard(user: UserPublic, db: Session, page: int):
 
 def get_user_posts_repo(username: str, current_user: UserPublic, db: Session, page: int = 1):
 
-    target_user_tuple = db.query(User.user_id).filter(User.username == username).first()
-    if not target_user_tuple:
+    target_user = get_loader(db).user_by_username(username)
+    if not target_user:
         raise HTTPException(status_code=404, detail="User not found")
-    target_user_id = target_user_tuple[0]
+    target_user_id = target_user.user_id
 
     if page < 1:
         raise InvalidPageLength
 
-    offset = (page - 1) * USER_POSTS_PAGE_LENGTH
-
+    # same order and index as the cursor variant below, then the shared column only hydration
     statement = (
-        select(
-            Post,
-            func.jsonb_agg(
-                func.json_build_object('url', MediaURL.url, 'media_type', MediaURL.media_type)
-            ).filter(MediaURL.post_id.isnot(None)).label("media_urls"),
-            PostLike.datetime_liked.label("is_liked"),
-        )
-        .join(User, Post.author_user_id == User.user_id)
-        .outerjoin(MediaURL, Post.post_id == MediaURL.post_id)
-        .outerjoin(PostLike, and_(PostLike.post_id == Post.post_id, PostLike.liker_user_id == current_user.user_id))
-        .group_by(Post.post_id, Post.author_user_id, PostLike.datetime_liked)
+        select(Post.post_id)
         .where(Post.author_user_id == target_user_id)
-        .offset(offset)
+        .order_by(desc(Post.datetime_posted), desc(Post.post_id))
+        .offset((page - 1) * USER_POSTS_PAGE_LENGTH)
         .limit(USER_POSTS_PAGE_LENGTH)
     )
 
-    posts = list(db.execute(statement).all())
+    return post_dicts(list(db.scalars(statement).all()), current_user, db)
 
 
-    def row_to_postpublic(row: tuple) -> PostPublic:
-        data = row[0].model_dump()
-        dt = data.get('datetime_posted')
-        if isinstance(dt, (datetime.datetime, datetime.date)):
-            # ensure datetime is ISO string, include timezone if present
-            if isinstance(dt, datetime.date) and not isinstance(dt, datetime.datetime):
-                # convert date -> datetime at midnight
-                dt = datetime.datetime(dt.year, dt.month, dt.day)
-            data['datetime_posted'] = dt.isoformat()
+# Keyset paged posts of a user, newest first, on (datetime_posted, post_id)
+def get_user_posts_cursor_repo(username: str, current_user: UserPublic, db: Session, cursor: str | None = None) -> dict:
 
-        media_urls = row[1]
-        is_liked_ts = row[2]
+    target_user = get_loader(db).user_by_username(username)
+    if not target_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    target_user_id = target_user.user_id
 
-        return PostPublic(
-            **data,
-            author=username,
-            media_urls=media_urls or [],
-            is_liked=(is_liked_ts is not None),
-        )
+    after = decode_cursor(cursor, (datetime.datetime, str)) if cursor else None
 
-    posts = list(map(row_to_postpublic, posts))
+    statement = select(Post.post_id, Post.datetime_posted).where(Post.author_user_id == target_user_id)
+    if after is not None:
+        statement = statement.where(tuple_(Post.datetime_posted, Post.post_id) < tuple_(*after))
+    statement = (
+        statement
+        .order_by(desc(Post.datetime_posted), desc(Post.post_id))
+        .limit(USER_POSTS_PAGE_LENGTH + 1)
+    )
 
-    # print("posts got: ", posts)
+    rows = db.execute(statement).all()
+    has_more = len(rows) > USER_POSTS_PAGE_LENGTH
+    rows = rows[:USER_POSTS_PAGE_LENGTH]
 
-    return posts
+    return {
+        "items": post_dicts([post_id for post_id, _ in rows], current_user, db),
+        "next_cursor": encode_cursor(rows[-1][1], rows[-1][0]) if has_more else None,
+    }
 
 
 def get_user_profile_repo(target_username: str, current_user: UserPublic, db: Session):
 
-    target = db.query(User).filter(User.username == target_username).first()
+    target = get_loader(db).user_by_username(target_username)
     if not target:
         raise HTTPException(status_code=404, detail="User not found")
     
-    posts_count = db.query(Post).filter(Post.author_user_id == target.user_id).count()
-
-    followers_count = db.query(FollowRequest).filter(
-        FollowRequest.requested_user_id == target.user_id,
-        FollowRequest.status == "accepted"
-    ).count()
-    following_count = db.query(FollowRequest).filter(
-        FollowRequest.requester_user_id == target.user_id,
-        FollowRequest.status == "accepted"
-    ).count()
-
-
-    all_the_requests_between_you_two = db.query(FollowRequest).filter(
-        or_(
-            and_(
-                FollowRequest.requester_user_id == current_user.user_id,
-                FollowRequest.requested_user_id == target.user_id,
-            ),
-            and_(
-                FollowRequest.requester_user_id == target.user_id,
-                FollowRequest.requested_user_id == current_user.user_id,
-            ),
-        ),
-    ).all()
-
-    # no_of_reqs = len(all_the_requests_between_you_two)
+
+    # both directions come from the viewer's cached edges, no query per profile view
+    edges = follow_graph.edges(db, current_user.user_id)
 
     you_follow_them_status = 0
     they_follow_you_status = 0
 
-    for req in all_the_requests_between_you_two:
-        if req.requester_user_id == current_user.user_id and req.status == 'pending':
-            # youre an absolute simp
-            you_follow_them_status = 0.5
-        elif req.requester_user_id == current_user.user_id and req.status == 'accepted':
-            you_follow_them_status = 1
-        elif req.requester_user_id == target.user_id and req.status == 'pending':
-            they_follow_you_status = 0.5
-        elif req.requester_user_id == target.user_id and req.status == 'accepted':
-            they_follow_you_status = 1
-
+    if has_edge(edges.following, target.user_id):
+        you_follow_them_status = 1
+    elif has_edge(edges.requested, target.user_id):
+        # youre an absolute simp
+        you_follow_them_status = 0.5
 
-    print("\n\n requests found:")
-    print(all_the_requests_between_you_two)
+    if has_edge(edges.followers, target.user_id):
+        they_follow_you_status = 1
+    elif has_edge(edges.requested_by, target.user_id):
+        they_follow_you_status = 0.5
 
     
     return {
         **target.dict(),
-        "posts_count": posts_count,
-        "followers_count": followers_count,
-        "following_count": following_count,
+        # counters are denormalized onto the user row, see src/repository/counters.py
+        "posts_count": target.posts_count,
+        "followers_count": target.followers_count,
+        "following_count": target.following_count,
         "they_follow_you": they_follow_you_status,
         "you_follow_them": you_follow_them_status
     }